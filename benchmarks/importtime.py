@@ -0,0 +1,195 @@
+"""
+Profiles the imports of the server startup and of every page.
+
+Each entry point is imported in a fresh interpreter run with
+`python -X importtime`, from a scratch working directory so the config is
+found the way a replica finds it. Pages run inside the server, which has
+streamlit loaded already, so only the imports on top of streamlit count
+towards a page. The report lists the total per entry point and the packages
+and modules that took longest; the script exits with status 1 if an entry
+point exceeds the budget.
+
+Usage:
+    python benchmarks/importtime.py [--top 10] [--budget-ms 1500] [--json]
+"""
+
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+
+# Entry point name, script whose imports are profiled and whether the
+# imports of streamlit are left out
+ENTRY_POINTS = [
+    ("startup", os.path.join(ROOT, "main.py"), False),
+    ("Home", os.path.join(SRC, "Home.py"), True),
+    *(
+        (f"page {n}", os.path.join(SRC, "pages", f"{n}.py"), True)
+        for n in range(1, 5)
+    ),
+]
+
+# Written to stderr between the imports that are already done and the
+# profiled ones
+_MARKER = "-- profiled imports --"
+
+
+def script_imports(path: str) -> List[str]:
+    """
+    Returns the modules a script imports, including imports inside its
+    functions, in order of appearance.
+    """
+
+    with open(path, "r") as file:
+        tree = ast.parse(file.read(), path)
+
+    modules = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def profile(
+    modules: List[str], preloaded: List[str]
+) -> List[Tuple[str, int, int, int]]:
+    """
+    Imports modules in a fresh interpreter.
+
+    Args:
+        modules (List[str]): The modules to profile.
+        preloaded (List[str]): Modules imported before, which are neither
+            reported nor counted.
+
+    Returns:
+        List[Tuple[str, int, int, int]]: The module, its nesting depth (0 for
+        the modules imported directly), and its own and cumulative import
+        time in microseconds, for every module that was imported.
+    """
+
+    code = "".join(f"import {module}\n" for module in preloaded)
+    code += f"import sys\nsys.stderr.write({_MARKER!r} + '\\n')\n"
+    code += "".join(f"import {module}\n" for module in modules)
+
+    env = dict(os.environ)
+    env.pop("DASHBOARD_CONFIG", None)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [SRC, env.get("PYTHONPATH")])
+    )
+    with tempfile.TemporaryDirectory() as scratch:
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=scratch,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+    lines = process.stderr.splitlines()
+    records = []
+    for line in lines[lines.index(_MARKER) + 1 :]:
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        records.append((name.strip(), depth, int(own), int(cumulative)))
+    return records
+
+
+def summarize(
+    records: List[Tuple[str, int, int, int]], top: int
+) -> Dict[str, object]:
+    """
+    Sums up the import times of an entry point.
+    """
+
+    packages: Dict[str, int] = defaultdict(int)
+    for name, _, own, _ in records:
+        packages[name.split(".")[0]] += own
+
+    return {
+        "total_ms": sum(c for _, depth, _, c in records if depth == 0) / 1000,
+        "modules": len(records),
+        "packages": [
+            {"package": package, "ms": us / 1000}
+            for package, us in sorted(
+                packages.items(), key=lambda item: -item[1]
+            )[:top]
+        ],
+        "imports": [
+            {"module": name, "ms": cumulative / 1000}
+            for name, depth, _, cumulative in sorted(
+                records, key=lambda record: -record[3]
+            )
+            if depth == 0
+        ][:top],
+    }
+
+
+def _print_report(report: Dict[str, dict]) -> None:
+    for entry, summary in report.items():
+        print(
+            f"\n{entry}: {summary['total_ms']:.0f} ms, "
+            f"{summary['modules']} modules"
+        )
+        print("  by package (own time):")
+        for item in summary["packages"]:
+            print(f"    {item['package']:<28} {item['ms']:9.1f} ms")
+        print("  direct imports (cumulative):")
+        for item in summary["imports"]:
+            print(f"    {item['module']:<28} {item['ms']:9.1f} ms")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--top", type=int, default=10, help="Packages and modules listed."
+    )
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        help="Fail if an entry point takes longer to import.",
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="Print the report as JSON."
+    )
+    args = parser.parse_args()
+
+    report = {}
+    for entry, path, after_streamlit in ENTRY_POINTS:
+        records = profile(
+            script_imports(path), ["streamlit"] if after_streamlit else []
+        )
+        report[entry] = summarize(records, args.top)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+
+    if args.budget_ms is None:
+        return 0
+
+    over = {
+        entry: summary["total_ms"]
+        for entry, summary in report.items()
+        if summary["total_ms"] > args.budget_ms
+    }
+    for entry, ms in over.items():
+        print(f"OVER BUDGET {entry}: {ms:.0f} ms > {args.budget_ms:.0f} ms")
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
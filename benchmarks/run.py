@@ -0,0 +1,528 @@
+"""
+Benchmarks the data loading and the pages of the dashboard on synthetic
+Superstore datasets of growing size.
+
+Each dataset size is measured in a fresh process, run in a working directory
+holding a config.yaml that points the app at a synthetic dataset (see
+src/synthetic.py) and is passed as $DASHBOARD_CONFIG. The results
+are written to a JSON file and compared against the baseline in
+benchmarks/baseline.json; the script exits with status 1 if any case got
+slower than the tolerance allows, and with status 2 if there is no baseline
+for any of the sizes.
+
+Usage:
+    python benchmarks/run.py [--sizes 10000 1000000] [--save-baseline]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+WORK_DIR = os.path.join(ROOT, ".cache", "benchmarks")
+
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+DEFAULT_OUTPUT = os.path.join(ROOT, "benchmarks", "results", "latest.json")
+
+# Cases faster than this are never reported as regressions, their timings
+# are dominated by noise
+MIN_REGRESSION_SECONDS = 0.005
+# Processes loading the snapshot at the same time, like serving workers
+MEMORY_PROBES = 2
+# Prefix of the lines a memory probe reports on stdout
+_PROBE = "PROBE"
+
+
+def _timed(
+    function: Callable[[], object],
+    repeat: int,
+    setup: Optional[Callable[[], object]] = None,
+) -> Dict[str, object]:
+    """
+    Runs a function `repeat` times and summarizes its wall clock times. The
+    optional `setup` runs before every run and is not timed.
+    """
+
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        runs.append(time.perf_counter() - start)
+
+    return {
+        "min": min(runs),
+        "median": statistics.median(runs),
+        "runs": runs,
+    }
+
+
+def _write_config(work_dir: str, rows: int, seed: int) -> None:
+    """
+    Writes a config.yaml that reads a synthetic dataset and keeps all
+    snapshots of the run inside its working directory.
+    """
+
+    with open(os.path.join(ROOT, "config.yaml"), "r") as file:
+        config = yaml.safe_load(file)
+
+    config["dataloader"].update(
+        source="synthetic",
+        synthetic={
+            "rows": rows,
+            "seed": seed,
+            "dir": os.path.join(WORK_DIR, "data"),
+        },
+        snapshot_dir=os.path.join(work_dir, "snapshots"),
+    )
+
+    # Share the boundaries with the app, so maps never hit the network twice
+    config["geo"]["cache_dir"] = os.path.join(ROOT, config["geo"]["cache_dir"])
+    for region in config["geo"]["regions"].values():
+        if region.get("path"):
+            region["path"] = os.path.join(ROOT, region["path"])
+
+    with open(os.path.join(work_dir, "config.yaml"), "w") as file:
+        yaml.safe_dump(config, file, sort_keys=False)
+
+
+def _clear_caches() -> None:
+    """
+    Drops the figures, rollups and KPI comparisons the pages cached, so the
+    next rerun computes them again from the loaded dataset.
+    """
+
+    from charts import figure_cache
+    from kpi import kpi_engine
+    from rollups import sales_rollups
+
+    figure_cache.clear()
+    sales_rollups.clear()
+    kpi_engine.clear()
+
+
+def _run_pages(repeat: int) -> Dict[str, Dict[str, object]]:
+    """
+    Times reruns of every page, including the non-default filter paths.
+
+    Every case is timed twice. The ".cold" case clears the figure, rollup
+    and KPI caches before each rerun, so it covers everything a user waits
+    for on a filter state nobody rendered yet: load_data, filtering,
+    grouping, figure construction and serialization. The plain case reruns
+    with the caches filled, as for a filter state rendered before.
+    """
+
+    # Streamlit is only imported in the benchmark worker processes
+    import streamlit.delta_generator as delta_generator
+    from streamlit.testing.v1 import AppTest
+
+    # Pages can only be switched to from a running app, as their sidebar
+    # links are resolved against the main script
+    app = AppTest.from_file(os.path.join(SRC, "Home.py"), default_timeout=600)
+    app.run()
+
+    # Time spent in st.plotly_chart, i.e. serializing the figures
+    chart_seconds = [0.0]
+    plotly_chart = delta_generator.DeltaGenerator.plotly_chart
+
+    def _timed_plotly_chart(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return plotly_chart(*args, **kwargs)
+        finally:
+            chart_seconds[0] += time.perf_counter() - start
+
+    delta_generator.DeltaGenerator.plotly_chart = _timed_plotly_chart
+
+    def _daily(app: AppTest) -> None:
+        app.selectbox[0].set_value("Daily")
+
+    def _one_month(app: AppTest) -> None:
+        first, _ = app.date_input[0].value
+        app.date_input[0].set_value(
+            (first, first + datetime.timedelta(days=30))
+        )
+
+    def _sales(app: AppTest) -> None:
+        app.selectbox[1].set_value("Sales")
+
+    cases: Dict[str, tuple] = {
+        "page.home": ("Home.py", None),
+        "page.1": ("pages/1.py", None),
+        "page.2": ("pages/2.py", None),
+        "page.2.daily": ("pages/2.py", _daily),
+        "page.3": ("pages/3.py", None),
+        "page.4": ("pages/4.py", None),
+        "page.4.sales": ("pages/4.py", _sales),
+        "page.4.one_month": ("pages/4.py", _one_month),
+    }
+
+    results = {}
+    for name, (page, interact) in cases.items():
+        app.switch_page(page)
+        app.run()
+        if interact is not None:
+            interact(app)
+
+        def _rerun() -> None:
+            app.run()
+            if app.exception:
+                raise RuntimeError(app.exception[0].value)
+
+        for case, setup in ((name, None), (f"{name}.cold", _clear_caches)):
+            chart_seconds[0] = 0.0
+            results[case] = _timed(_rerun, repeat, setup)
+            results[case]["plotly_chart"] = chart_seconds[0] / repeat
+
+    delta_generator.DeltaGenerator.plotly_chart = plotly_chart
+    return results
+
+
+def _memory() -> Dict[str, float]:
+    """
+    Returns the resident, proportional and anonymous memory of this process
+    in MB. The proportional set size splits every page shared with other
+    processes, e.g. of a memory-mapped file, between them. Linux only.
+    """
+
+    names = {"Rss": "rss_mb", "Pss": "pss_mb", "Anonymous": "anon_mb"}
+    memory = {}
+    with open("/proc/self/smaps_rollup", "r") as file:
+        for line in file:
+            name, _, value = line.partition(":")
+            if name in names:
+                memory[names[name]] = int(value.split()[0]) / 1024
+    return memory
+
+
+def run_probe() -> None:
+    """
+    Loads the dataset snapshot like a serving worker and reads every column
+    once. Reports on stdout when it is loaded, then, for every line on
+    stdin, its memory as JSON; exits at the end of stdin.
+    """
+
+    import numpy as np
+    import pandas as pd
+
+    from loader import DataLoader, DatasetCache
+
+    df = DataLoader(cache=DatasetCache()).df
+    for column in df.columns:
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.cat.codes
+        if isinstance(series.dtype, np.dtype):
+            # One byte per page is enough to map it in
+            values = series.to_numpy()
+            int(values.view(np.uint8)[::4096].sum())
+
+    print(f"{_PROBE} ready", flush=True)
+    for _ in sys.stdin:
+        print(f"{_PROBE} {json.dumps(_memory())}", flush=True)
+
+
+def _read_probe(process: subprocess.Popen) -> str:
+    for line in process.stdout:
+        if line.startswith(_PROBE):
+            return line[len(_PROBE) :].strip()
+    raise RuntimeError("The memory probe exited early")
+
+
+def probe_memory(processes: int) -> List[Dict[str, float]]:
+    """
+    Loads the snapshot in several processes at once and measures their
+    memory, once all of them hold the dataset. Columns mapped from the
+    shared snapshot count towards every process's RSS, but only with their
+    share towards its PSS.
+
+    Args:
+        processes (int): Number of processes.
+
+    Returns:
+        List[Dict[str, float]]: The memory of every process, see _memory.
+    """
+
+    probes = [
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--probe"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(processes)
+    ]
+    try:
+        for probe in probes:
+            _read_probe(probe)
+        memory = []
+        for probe in probes:
+            probe.stdin.write("\n")
+            probe.stdin.flush()
+            memory.append(json.loads(_read_probe(probe)))
+    finally:
+        for probe in probes:
+            probe.stdin.close()
+            probe.wait()
+    return memory
+
+
+def run_worker(rows: int, repeat: int, result_path: str) -> None:
+    """
+    Measures one dataset size. Must run in the working directory holding the
+    benchmark's config.yaml, with $DASHBOARD_CONFIG naming it and src/ on
+    the module search path.
+    """
+
+    import resource
+
+    from loader import DataLoader, DatasetCache
+    from sources import create_source
+
+    # Generates the dataset, unless an earlier run already did
+    create_source().resolve()
+
+    snapshot_dir = os.path.join(os.getcwd(), "snapshots")
+    results: Dict[str, Dict[str, object]] = {}
+
+    def _load_csv() -> None:
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+        DataLoader(cache=DatasetCache())
+
+    def _load_snapshot() -> None:
+        DataLoader(cache=DatasetCache())
+
+    results["load.csv"] = _timed(_load_csv, repeat)
+    results["load.snapshot"] = _timed(_load_snapshot, repeat)
+    memory = probe_memory(MEMORY_PROBES)
+
+    loader = DataLoader()
+    first, last = loader.get_date_bounds()
+    results["loader.get_data_for_metric"] = _timed(
+        lambda: loader.get_data_for_metric(
+            ["Order Date", "Category", "Sales"], date_range=(first, last)
+        ),
+        repeat,
+    )
+
+    results.update(_run_pages(repeat))
+
+    # ru_maxrss is reported in kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    with open(result_path, "w") as file:
+        json.dump(
+            {
+                "rows": rows,
+                "peak_rss_mb": peak_rss,
+                "workers_memory": memory,
+                "cases": results,
+            },
+            file,
+        )
+
+
+def run_size(rows: int, repeat: int, seed: int) -> Dict[str, object]:
+    """
+    Measures a dataset size in a fresh worker process.
+    """
+
+    work_dir = os.path.join(WORK_DIR, f"run-{rows}")
+    shutil.rmtree(work_dir, ignore_errors=True)
+    os.makedirs(work_dir)
+    _write_config(work_dir, rows, seed)
+
+    result_path = os.path.join(work_dir, "result.json")
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [SRC, env.get("PYTHONPATH")])
+    )
+    env["DASHBOARD_CONFIG"] = os.path.join(work_dir, "config.yaml")
+    subprocess.run(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--worker",
+            str(rows),
+            "--repeat",
+            str(repeat),
+            "--result",
+            result_path,
+        ],
+        cwd=work_dir,
+        env=env,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+    with open(result_path, "r") as file:
+        return json.load(file)
+
+
+def compare(
+    results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float
+) -> List[str]:
+    """
+    Compares the median time of every case against the baseline.
+
+    Args:
+        results (Dict[str, dict]): The "sizes" of the current results.
+        baseline (Dict[str, dict]): The "sizes" of the baseline results.
+        tolerance (float): Allowed relative slowdown, e.g. 0.25 for 25%.
+
+    Returns:
+        List[str]: A description of every regression.
+    """
+
+    regressions = []
+    for size, result in results.items():
+        base_cases = baseline.get(size, {}).get("cases", {})
+        for case, timing in result["cases"].items():
+            if case not in base_cases:
+                continue
+            old, new = base_cases[case]["median"], timing["median"]
+            if (
+                new > old * (1 + tolerance)
+                and new - old > MIN_REGRESSION_SECONDS
+            ):
+                regressions.append(
+                    f"{case} @ {size} rows: {old:.4f}s -> {new:.4f}s "
+                    f"(+{(new / old - 1) * 100:.0f}%)"
+                )
+
+    return regressions
+
+
+def _print_results(
+    results: Dict[str, dict], baseline: Optional[Dict[str, dict]]
+) -> None:
+    for size, result in results.items():
+        print(
+            f"\n{int(size):,} rows (peak RSS {result['peak_rss_mb']:.0f} MB)"
+        )
+        for index, memory in enumerate(result.get("workers_memory", [])):
+            print(
+                f"  snapshot in worker {index}: RSS {memory['rss_mb']:.0f} MB, "
+                f"PSS {memory['pss_mb']:.0f} MB, "
+                f"anonymous {memory['anon_mb']:.0f} MB"
+            )
+        base_cases = (baseline or {}).get(size, {}).get("cases", {})
+        for case, timing in result["cases"].items():
+            line = f"  {case:<30} {timing['median']:9.4f}s"
+            if case in base_cases:
+                old = base_cases[case]["median"]
+                line += (
+                    f"  (baseline {old:.4f}s, {timing['median'] / old:.2f}x)"
+                )
+            print(line)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="Row counts of the synthetic datasets.",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs of each case."
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Seed of the dataset generator."
+    )
+    parser.add_argument(
+        "--output", default=DEFAULT_OUTPUT, help="Where to write results."
+    )
+    parser.add_argument(
+        "--baseline", default=DEFAULT_BASELINE, help="Baseline to compare to."
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store the results as the new baseline instead of comparing.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed relative slowdown before a case counts as regression.",
+    )
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    parser.add_argument("--probe", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        run_probe()
+        return 0
+    if args.worker is not None:
+        run_worker(args.worker, args.repeat, args.result)
+        return 0
+
+    results = {
+        "meta": {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "sizes": {
+            str(rows): run_size(rows, args.repeat, args.seed)
+            for rows in args.sizes
+        },
+    }
+
+    baseline = None
+    if not args.save_baseline:
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r") as file:
+                baseline = json.load(file)["sizes"]
+        else:
+            print(
+                f"NO BASELINE at {args.baseline}, nothing was compared; "
+                "store one with --save-baseline",
+                file=sys.stderr,
+            )
+
+    _print_results(results["sizes"], baseline)
+
+    output = args.baseline if args.save_baseline else args.output
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.save_baseline:
+        return 0
+    if baseline is None:
+        return 2
+
+    missing = sorted(set(results["sizes"]) - set(baseline), key=int)
+    for size in missing:
+        print(f"NO BASELINE for {int(size):,} rows, not compared")
+    if len(missing) == len(results["sizes"]):
+        return 2
+
+    regressions = compare(results["sizes"], baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,75 @@
-import subprocess
+import os
+import sys
+from typing import Optional
 
+import click
+from streamlit import config as st_config
+from streamlit.web import bootstrap, cli
 
-def run_streamlit_app():
-    subprocess.run(["streamlit", "run", "src/Home.py"])
+ROOT = os.path.dirname(os.path.abspath(__file__))
+MAIN_SCRIPT = os.path.join(ROOT, "src", "Home.py")
+
+
+@click.command(context_settings={"auto_envvar_prefix": "STREAMLIT"})
+@click.option(
+    "--workers",
+    type=int,
+    help="Streamlit processes to serve from (default: serving.workers).",
+)
+@click.option("--worker-index", type=int, hidden=True)
+@cli.configurator_options
+def run_streamlit_app(
+    workers: Optional[int], worker_index: Optional[int], **flag_options
+):
+    """
+    Serves the dashboard from this process, warming its caches up first
+    (see src/warmup.py) so they are shared with the sessions. With several
+    workers, serves it from that many processes behind a load balancer
+    instead (see src/serving.py). Accepts the config options of
+    `streamlit run`, as flags or environment variables.
+    """
+
+    sys.path.insert(0, os.path.dirname(MAIN_SCRIPT))
+    bootstrap.load_config_options(flag_options=flag_options)
+
+    import metrics
+    import serving
+    import warmup
+    from config import (
+        METRICS_ENABLED,
+        METRICS_HOST,
+        METRICS_PORT,
+        SERVING_WORKERS,
+        WARMUP_ENABLED,
+        WARMUP_READY_FILE,
+        WARMUP_WAIT,
+    )
+
+    workers = workers or SERVING_WORKERS
+    if worker_index is None and workers > 1:
+        sys.exit(
+            serving.serve(
+                workers,
+                flag_options,
+                st_config.get_option("server.address"),
+                st_config.get_option("server.port"),
+            )
+        )
+
+    if METRICS_ENABLED:
+        metrics.serve(METRICS_HOST, METRICS_PORT + (worker_index or 0))
+
+    ready_file = (
+        WARMUP_READY_FILE
+        if worker_index is None
+        else serving.worker_ready_file(worker_index)
+    )
+    if WARMUP_ENABLED and WARMUP_WAIT:
+        warmup.warm_up(ready_file=ready_file)
+    elif WARMUP_ENABLED:
+        warmup.start(ready_file=ready_file)
+
+    bootstrap.run(MAIN_SCRIPT, False, [], flag_options)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,598 @@
+import datetime
+import json
+import threading
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+import pandas as pd
+import plotly.graph_objects as go
+
+from config import (
+    COLUMNS_GEOMAP,
+    FIGURE_CACHE_MAX_BYTES,
+    TIMESERIES_MAX_POINTS,
+    TIMESERIES_METHOD,
+)
+from geo import geojson_store
+from loader import DataLoader
+from metrics import FIGURE_CACHE_REQUESTS, register_gauge
+from rollups import sales_rollups
+from utils.downsample import downsample
+from utils.frames import isin_codes
+from utils.lru import LRUCache
+from utils.perf import timed
+from utils.vectorized import bucketize, sort_by_order, split_traces
+
+# 🔧 Colors and display order of the product categories shared by all charts
+CATEGORY_COLORS = {
+    "Office Supplies": "#0068c9",  # Dark blue
+    "Technology": "#83c9ff",  # Light blue
+    "Furniture": "#ff2a2b",  # Red
+}
+# Top to bottom in bar charts
+CATEGORY_ORDER_PLOT = ["Furniture", "Technology", "Office Supplies"]
+# Legend order (reversed from plot order)
+CATEGORY_ORDER_LEGEND = ["Office Supplies", "Technology", "Furniture"]
+
+# 🔁 Map granularity to pandas frequency
+FREQUENCIES = {"Daily": "D", "Weekly": "W", "Monthly": "ME"}
+
+# Serializes plotly's lazy imports, see _import_plotly
+_plotly_lock = threading.Lock()
+_plotly_imported = False
+
+
+def _import_plotly():
+    """
+    Finishes the imports plotly defers to the first figure, before figures
+    are built concurrently: its validators are imported by the first
+    go.Figure, and its JSON encoder uses PIL.Image whenever another thread
+    has started importing it. Threads building their first figures at the
+    same time could otherwise see these modules half initialized.
+    """
+
+    global _plotly_imported
+    with _plotly_lock:
+        if not _plotly_imported:
+            import PIL.Image  # noqa: F401
+
+            go.Figure()
+            _plotly_imported = True
+
+
+def _express():
+    """
+    Imports plotly.express on first use, as it is slow to import and only
+    the line chart and the map need it.
+    """
+
+    with _plotly_lock:
+        import plotly.express as px
+
+    return px
+
+
+@timed("chart.profit_margin")
+def profit_margin_chart(grouped: pd.DataFrame) -> go.Figure:
+    """
+    Builds the horizontal bar chart of the profit margin per sub-category.
+
+    Args:
+        grouped (pd.DataFrame): "Sub-Category", "Category" and the average
+            "profit_margin".
+
+    Returns:
+        go.Figure: The bar chart.
+    """
+
+    # Sort by profit_margin within each category (descending)
+    grouped_sorted = sort_by_order(
+        grouped, "Category", CATEGORY_ORDER_PLOT, "profit_margin"
+    )
+
+    fig = go.Figure()
+
+    # Manually add traces in reverse order for correct legend display
+    for category, cat_data in split_traces(
+        grouped_sorted, "Category", CATEGORY_ORDER_LEGEND
+    ):
+        fig.add_trace(
+            go.Bar(
+                x=cat_data["profit_margin"],
+                y=cat_data["Sub-Category"],
+                name=category,
+                orientation="h",
+                marker_color=CATEGORY_COLORS[category],
+                text=cat_data["profit_margin"],
+                texttemplate="%{text:.2f}%",
+                textposition="inside",
+            )
+        )
+
+    fig.update_layout(
+        title="Profit Margin by Sub-Category and Category",
+        xaxis_title="Profit Margin (%)",
+        yaxis_title="Sub-Category",
+        legend_title="Category",
+        height=600,
+        width=800,
+        showlegend=True,
+        legend=dict(
+            traceorder="reversed"  # This ensures the legend appears in the order traces were added
+        ),
+        barmode="stack",  # This doesn't affect our horizontal bars but ensures correct legend behavior
+    )
+
+    return fig
+
+
+@timed("chart.sales_line")
+def sales_line_chart(
+    sales_over_time: pd.DataFrame, granularity: str, text_color: str
+) -> go.Figure:
+    """
+    Builds the line chart of the sales over time per category.
+
+    Args:
+        sales_over_time (pd.DataFrame): "Order Date", "Category" and "Sales".
+        granularity (str): The time granularity shown in the title.
+        text_color (str): The font color of the chart.
+
+    Returns:
+        go.Figure: The line chart.
+    """
+
+    fig = _express().line(
+        sales_over_time,
+        x="Order Date",
+        y="Sales",
+        color="Category",
+        markers=True,
+        template="plotly_white",
+        title=f"Sales Over Time ({granularity})",
+        labels={"Sales": "Total Sales", "Order Date": "Date"},
+        color_discrete_map=CATEGORY_COLORS,
+        category_orders={"Category": CATEGORY_ORDER_LEGEND},
+    )
+
+    fig.update_layout(
+        xaxis_title="Date",
+        yaxis_title="Sales",
+        title_x=0.5,
+        font=dict(family="Arial", size=12, color=text_color),
+    )
+
+    return fig
+
+
+@timed("chart.shipment_pie")
+def shipment_pie_chart(data: pd.DataFrame, title: str) -> go.Figure:
+    """
+    Builds the pie chart of the shipment counts per ship mode.
+
+    Args:
+        data (pd.DataFrame): "Ship Mode" and "Shipment Count".
+        title (str): The chart title.
+
+    Returns:
+        go.Figure: The pie chart.
+    """
+
+    shipment_counts = (
+        data.groupby("Ship Mode", observed=True)["Shipment Count"]
+        .sum()
+        .sort_values(ascending=False)
+    )
+    fig = go.Figure(
+        data=[
+            go.Pie(
+                labels=shipment_counts.index,
+                values=shipment_counts.values,
+                hole=0.3,
+            )
+        ]
+    )
+    fig.update_layout(title=title, title_x=0.5)
+    return fig
+
+
+# 🔧 Colors of the low, medium and high value ranges of the map
+RANGE_COLORS = {
+    "low": "#0068c9",  # Dark blue
+    "medium": "#83c9ff",  # Light blue
+    "high": "#ff2a2b",  # Red
+}
+
+
+@timed("chart.state_choropleth")
+def state_choropleth(
+    performance_by_state: pd.DataFrame,
+    performance_metric: str,
+    geojson: dict,
+    featureidkey: str,
+) -> go.Figure:
+    """
+    Builds the map of a performance metric per US state.
+
+    Args:
+        performance_by_state (pd.DataFrame): "State" and the metric total.
+        performance_metric (str): "Profit" or "Sales".
+        geojson (dict): The state boundaries.
+        featureidkey (str): The boundary property matching "State".
+
+    Returns:
+        go.Figure: The choropleth map.
+    """
+
+    column = f"Total {performance_metric}"
+    performance_by_state = performance_by_state.copy()
+
+    # Calculate thresholds for color mapping
+    data_values = performance_by_state[column]
+    thresholds = [data_values.quantile(0.33), data_values.quantile(0.66)]
+
+    # Add a custom color column to the dataframe
+    performance_by_state["Custom Color"] = bucketize(
+        data_values,
+        thresholds,
+        [RANGE_COLORS["low"], RANGE_COLORS["medium"], RANGE_COLORS["high"]],
+    )
+
+    fig = _express().choropleth(
+        performance_by_state,
+        geojson=geojson,
+        locations="State",
+        featureidkey=featureidkey,
+        color=column,
+        color_discrete_sequence=performance_by_state["Custom Color"],
+        scope="usa",
+        labels={column: f"Total {performance_metric} ($)"},
+        title=f"Total {performance_metric} by State",
+    )
+
+    # Update geo settings for better visualization
+    fig.update_geos(
+        fitbounds="locations",
+        visible=True,
+        projection_type="albers usa",
+    )
+    fig.update_layout(autosize=True, height=600)
+
+    return fig
+
+
+def _normalize(value) -> Hashable:
+    """
+    Turns a filter value into a hashable key part. Lists and sets are
+    selections, e.g. of a multiselect, and are sorted so equal selections map
+    to the same key in any order; tuples are positional, e.g. a date range,
+    and keep their order.
+    """
+
+    if isinstance(value, dict):
+        return tuple(sorted((k, _normalize(v)) for k, v in value.items()))
+    if isinstance(value, (list, set, frozenset)):
+        return tuple(sorted(_normalize(v) for v in value))
+    if isinstance(value, tuple):
+        return tuple(_normalize(v) for v in value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if hasattr(value, "item"):
+        # numpy scalars, e.g. years taken from a DataFrame
+        return value.item()
+    return value
+
+
+class FigureCache:
+    """
+    A process-wide LRU cache of rendered figures, stored as Plotly JSON and
+    keyed by page, normalized filter state and data version.
+
+    Serialized figures are immutable, so every session gets its own Figure
+    and the size of each entry is known. The least recently used figures
+    are evicted once the entries exceed `max_bytes`.
+    """
+
+    def __init__(self, max_bytes: int = FIGURE_CACHE_MAX_BYTES):
+        """
+        Args:
+            max_bytes (int): Upper bound for the size of all cached JSON.
+        """
+
+        self.max_bytes = max_bytes
+        self._figures = LRUCache(max_bytes, size_of=len)
+
+    @property
+    def size(self) -> int:
+        """
+        The size of all cached JSON in bytes.
+        """
+
+        return self._figures.size
+
+    def get_json(
+        self,
+        page: str,
+        filters: Dict[str, object],
+        version: Hashable,
+        build: Callable[[], Optional[go.Figure]],
+    ) -> Optional[str]:
+        """
+        Returns the serialized figure for a filter state, building it on the
+        first request.
+
+        Args:
+            page (str): The name of the chart.
+            filters (Dict[str, object]): Every input the figure depends on.
+            version (Hashable): The version of the data the figure shows.
+            build (Callable[[], Optional[go.Figure]]): Builds the figure, or
+                returns None if there is nothing to show (not cached).
+
+        Returns:
+            Optional[str]: The figure as Plotly JSON, or None.
+        """
+
+        key = (page, _normalize(filters), version)
+
+        figure_json = self._figures.get(key)
+        if figure_json is not None:
+            FIGURE_CACHE_REQUESTS.inc(figure=page, result="hit")
+            return figure_json
+
+        FIGURE_CACHE_REQUESTS.inc(figure=page, result="miss")
+
+        # Built outside the lock, so slow figures do not block other pages,
+        # once plotly is fully imported (see _import_plotly)
+        _import_plotly()
+        fig = build()
+        if fig is None:
+            return None
+        with timed("figure.serialize"):
+            figure_json = fig.to_json()
+
+        return self._figures.put(key, figure_json)
+
+    def get(
+        self,
+        page: str,
+        filters: Dict[str, object],
+        version: Hashable,
+        build: Callable[[], Optional[go.Figure]],
+    ) -> Optional[go.Figure]:
+        """
+        Like get_json, but returns a new Figure for the cached JSON.
+        """
+
+        figure_json = self.get_json(page, filters, version, build)
+        if figure_json is None:
+            return None
+
+        # The JSON was written from a validated figure, so validating it
+        # again would only repeat the most expensive part of building it
+        with timed("figure.deserialize"):
+            return go.Figure(json.loads(figure_json), _validate=False)
+
+    def clear(self):
+        """
+        Drops all cached figures.
+        """
+
+        self._figures.clear()
+
+
+figure_cache = FigureCache()
+register_gauge(
+    "dashboard_figure_cache_bytes",
+    "Size of the figures held by the figure cache.",
+    lambda: figure_cache.size,
+)
+
+
+@timed("page1.load_data")
+def profit_margins(loader: DataLoader) -> pd.DataFrame:
+    """
+    Reads the average profit margin per year and sub-category from the cube.
+    """
+    return loader.cube.query(
+        by=["year", "Category", "Sub-Category"],
+        measures={"profit_margin": ("profit_margin", "mean")},
+    )
+
+
+def profit_margin_figure(
+    loader: DataLoader, year: int, categories: List[str]
+) -> go.Figure:
+    """
+    Returns the bar chart of page 1 for the selected year and categories.
+    """
+
+    @timed("page1.build_figure")
+    def build() -> go.Figure:
+        profit_margin_df = profit_margins(loader)
+        filtered_df = profit_margin_df[
+            (profit_margin_df["year"] == year)
+            & isin_codes(profit_margin_df["Category"], categories)
+        ]
+
+        # Group by Sub-Category and calculate average profit_margin
+        grouped = (
+            filtered_df.groupby(["Sub-Category", "Category"], observed=True)[
+                "profit_margin"
+            ]
+            .mean()
+            .reset_index()
+        )
+        return profit_margin_chart(grouped)
+
+    return figure_cache.get(
+        "profit_margin",
+        {"year": year, "categories": categories},
+        loader.version,
+        build,
+    )
+
+
+def sales_figure(
+    loader: DataLoader,
+    date_range: Tuple[datetime.date, datetime.date],
+    granularity: str,
+    categories: List[str],
+    text_color: Optional[str],
+) -> go.Figure:
+    """
+    Returns the line chart of page 2 for the selected dates, granularity
+    and categories.
+    """
+
+    @timed("page2.build_figure")
+    def build() -> go.Figure:
+        # 🧮 Look the periods up in the rollup of the selected frequency
+        sales_over_time = sales_rollups.query(
+            loader, date_range, FREQUENCIES[granularity], categories
+        )
+        # Cap the points per category, however long the range
+        sales_over_time = downsample(
+            sales_over_time,
+            "Order Date",
+            "Sales",
+            "Category",
+            TIMESERIES_MAX_POINTS,
+            TIMESERIES_METHOD,
+        )
+        return sales_line_chart(sales_over_time, granularity, text_color)
+
+    return figure_cache.get(
+        "sales_over_time",
+        {
+            "date_range": tuple(date_range),
+            "granularity": granularity,
+            "categories": categories,
+            "text_color": text_color,
+        },
+        loader.version,
+        build,
+    )
+
+
+@timed("page3.load_data")
+def shipment_counts(loader: DataLoader) -> pd.DataFrame:
+    """
+    Reads the shipment counts per ship year, sub-category and ship mode
+    from the cube.
+    """
+    return loader.cube.query(
+        by=["ship_year", "Category", "Sub-Category", "Ship Mode"],
+        measures={"Shipment Count": ("count", "sum")},
+    ).rename(columns={"ship_year": "Year"})
+
+
+def _shipments_of_year(loader: DataLoader, year: int) -> pd.DataFrame:
+    shipment_df = shipment_counts(loader)
+    return shipment_df[shipment_df["Year"] == year]
+
+
+def shipment_total_figure(loader: DataLoader, year: int) -> go.Figure:
+    """
+    Returns the pie chart of page 3 of all shipments of the selected year.
+    """
+
+    return figure_cache.get(
+        "shipment_total",
+        {"year": year},
+        loader.version,
+        lambda: shipment_pie_chart(
+            _shipments_of_year(loader, year),
+            f"Total Distribution of Ship Modes ({year})",
+        ),
+    )
+
+
+def shipment_category_figure(
+    loader: DataLoader, year: int, category: str
+) -> go.Figure:
+    """
+    Returns the pie chart of page 3 of the selected category's shipments of
+    the selected year.
+    """
+
+    def build() -> go.Figure:
+        shipment_df = _shipments_of_year(loader, year)
+        return shipment_pie_chart(
+            shipment_df[isin_codes(shipment_df["Category"], [category])],
+            f"Distribution for {category}",
+        )
+
+    return figure_cache.get(
+        "shipment_category",
+        {"year": year, "category": category},
+        loader.version,
+        build,
+    )
+
+
+def state_figure(
+    loader: DataLoader,
+    year: int,
+    date_range: Tuple[datetime.date, datetime.date],
+    performance_metric: str,
+    categories: List[str],
+) -> Optional[go.Figure]:
+    """
+    Returns the map of page 4 for the selected filters, or None if no data
+    matches them.
+
+    Raises:
+        URLError: If the state boundaries could not be downloaded.
+    """
+
+    # Determine aggregation column based on selected metric
+    aggregation_column = "Sales" if performance_metric == "Sales" else "Profit"
+
+    @timed("page4.build_figure")
+    def build() -> Optional[go.Figure]:
+        # A date range spanning the whole year is read from the cube
+        if tuple(date_range) == loader.get_date_bounds(year):
+            performance_by_state = loader.cube.query(
+                by=["State"],
+                measures={aggregation_column: (aggregation_column, "sum")},
+                where={"year": year, "Category": categories},
+            )
+        else:
+            # Slice the selected dates (all within the year) and filter
+            # categories
+            geo_df = loader.get_data_for_metric(
+                COLUMNS_GEOMAP, date_range=date_range
+            )
+            filtered_df = geo_df[isin_codes(geo_df["Category"], categories)]
+            performance_by_state = (
+                filtered_df.groupby("State", observed=True)[aggregation_column]
+                .sum()
+                .reset_index()
+            )
+
+        if performance_by_state.empty:
+            return None
+
+        performance_by_state.columns = [
+            "State",
+            f"Total {performance_metric}",
+        ]
+
+        # GeoJSON data for US states (cached for the whole process)
+        return state_choropleth(
+            performance_by_state,
+            performance_metric,
+            geojson_store.get("state"),
+            geojson_store.featureidkey("state"),
+        )
+
+    return figure_cache.get(
+        "state_performance",
+        {
+            "year": year,
+            "date_range": tuple(date_range),
+            "metric": performance_metric,
+            "categories": categories,
+        },
+        loader.version,
+        build,
+    )
@@ -1,15 +1,159 @@
+import functools
 import os
+from typing import Any, Dict, Optional
 
 import yaml
 
-if os.path.exists("config.yaml"):
-    print("Config file found.")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Names another config file, e.g. for benchmarks or a replica's settings
+CONFIG_ENV = "DASHBOARD_CONFIG"
 
-with open("config.yaml", "r") as file:
-    config = yaml.safe_load(file)
+# Keys every config file must define, by section
+REQUIRED_KEYS = {
+    "dataloader": [
+        "dataset_name",
+        "dataset_file",
+        "date_format",
+        "date_columns",
+        "categorical_columns",
+    ],
+    "cube": ["dimensions", "measures"],
+    "geo": [
+        "cache_dir",
+        "simplify_tolerance",
+        "coordinate_precision",
+        "regions",
+    ],
+    "columns": ["piechart", "barplot", "geomap", "linechart", "bentoboxes"],
+}
 
+
+def config_path() -> str:
+    """
+    Returns the config file in use: the one named by $DASHBOARD_CONFIG, or
+    the project's config.yaml, whatever the working directory.
+    """
+
+    return os.path.abspath(
+        os.environ.get(CONFIG_ENV) or os.path.join(ROOT, "config.yaml")
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def load_config(path: str) -> Dict[str, Any]:
+    """
+    Reads and validates a config file, once per process.
+
+    Args:
+        path (str): The config file.
+
+    Returns:
+        Dict[str, Any]: The parsed config.
+
+    Raises:
+        ValueError: If the file lacks a required section or key.
+    """
+
+    with open(path, "r") as file:
+        config = yaml.safe_load(file)
+
+    if not isinstance(config, dict):
+        raise ValueError(f"{path}: expected a mapping of sections")
+    for section, keys in REQUIRED_KEYS.items():
+        if not isinstance(config.get(section), dict):
+            raise ValueError(f"{path}: missing section '{section}'")
+        missing = [key for key in keys if key not in config[section]]
+        if missing:
+            raise ValueError(
+                f"{path}: missing keys in '{section}': {', '.join(missing)}"
+            )
+    return config
+
+
+def _resolve(path: Optional[str]) -> Optional[str]:
+    """
+    Resolves a path of the config relative to the config file's directory.
+    """
+
+    if path is None:
+        return None
+    return os.path.join(os.path.dirname(CONFIG_FILE), path)
+
+
+CONFIG_FILE = config_path()
+config = load_config(CONFIG_FILE)
+
+DATA_SOURCE = config["dataloader"].get("source", "kaggle")
 DATASET_NAME = config["dataloader"]["dataset_name"]
 DATASET_FILE = config["dataloader"]["dataset_file"]
+DATASET_PATH = _resolve(config["dataloader"].get("path"))
+DATASET_TABLE = config["dataloader"].get("table", "superstore")
+DATASET_CACHE_TTL = config["dataloader"].get("cache_ttl", 300)
+INCREMENTAL_LOADING = config["dataloader"].get("incremental", True)
+CHUNKSIZE = config["dataloader"].get("chunksize")
+KEEP_ROWS = config["dataloader"].get("keep_rows", True)
+SNAPSHOT_DIR = _resolve(
+    config["dataloader"].get("snapshot_dir", ".cache/snapshots")
+)
+_synthetic = config["dataloader"].get("synthetic", {})
+SYNTHETIC_ROWS = _synthetic.get("rows", 10_000)
+SYNTHETIC_SEED = _synthetic.get("seed", 0)
+SYNTHETIC_DIR = _resolve(_synthetic.get("dir", ".cache/synthetic"))
+DATE_FORMAT = config["dataloader"]["date_format"]
+DATE_COLUMNS = config["dataloader"]["date_columns"]
+CATEGORICAL_COLUMNS = config["dataloader"]["categorical_columns"]
+COLUMN_DTYPES = config["dataloader"].get("dtypes", {})
+LAZY_COLUMNS = config["dataloader"].get("lazy_columns", False)
+
+CUBE_DIMENSIONS = config["cube"]["dimensions"]
+CUBE_MEASURES = config["cube"]["measures"]
+
+GEO_CACHE_DIR = _resolve(config["geo"]["cache_dir"])
+GEO_TOLERANCE = config["geo"]["simplify_tolerance"]
+GEO_PRECISION = config["geo"]["coordinate_precision"]
+GEO_REGIONS = {
+    level: {**region, "path": _resolve(region.get("path"))}
+    for level, region in config["geo"]["regions"].items()
+}
+
+_warmup = config.get("warmup", {})
+WARMUP_ENABLED = _warmup.get("enabled", True)
+WARMUP_WORKERS = _warmup.get("workers", 4)
+WARMUP_WAIT = _warmup.get("wait", False)
+WARMUP_READY_FILE = _resolve(_warmup.get("ready_file"))
+
+PERF_LOG = config.get("perf", {}).get("log", True)
+PERF_LOG_FILE = _resolve(config.get("perf", {}).get("log_file"))
+
+_metrics = config.get("metrics", {})
+METRICS_ENABLED = _metrics.get("enabled", True)
+METRICS_HOST = _metrics.get("host", "127.0.0.1")
+METRICS_PORT = _metrics.get("port", 9100)
+
+_timeseries = config.get("timeseries", {})
+TIMESERIES_MAX_POINTS = _timeseries.get("max_points", 800)
+TIMESERIES_METHOD = _timeseries.get("method", "lttb")
+
+_compute = config.get("compute", {})
+COMPUTE_WORKERS = _compute.get("workers", 4)
+COMPUTE_MAX_PENDING = _compute.get("max_pending", 64)
+
+_serving = config.get("serving", {})
+SERVING_WORKERS = _serving.get("workers", 1)
+SERVING_WORKER_PORT = _serving.get("worker_port", 8601)
+
+_narrative = config.get("narrative", {})
+NARRATIVE_BACKEND = _narrative.get("backend", "template")
+NARRATIVE_URL = _narrative.get(
+    "url", "https://api.openai.com/v1/chat/completions"
+)
+NARRATIVE_MODEL = _narrative.get("model", "gpt-4o-mini")
+NARRATIVE_API_KEY_ENV = _narrative.get("api_key_env", "OPENAI_API_KEY")
+NARRATIVE_CACHE_SIZE = _narrative.get("cache_size", 128)
+
+FIGURE_CACHE_MAX_BYTES = (
+    config.get("figures", {}).get("cache_max_mb", 64) * 2**20
+)
 
 COLUMNS_PIECHART = config["columns"]["piechart"]
 COLUMNS_BARPLOT = config["columns"]["barplot"]
@@ -0,0 +1,170 @@
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.frames import concat_frames, isin_codes
+
+# Name of the measure holding the number of fact rows in each cell
+COUNT = "count"
+
+
+class DataCube:
+    """
+    A materialized aggregate of the fact table over a fixed set of dimensions.
+
+    Each cell stores the sum and the number of non-null values of every
+    measure plus the number of fact rows, so any slice or rollup of sums,
+    means and counts can be answered from the cells without touching the
+    rows again.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        dimensions: List[str],
+        measures: List[str],
+    ):
+        """
+        Builds the cube from the prepared fact table.
+
+        Args:
+            df (pd.DataFrame): The prepared fact table.
+            dimensions (List[str]): Columns the cube is grouped by.
+            measures (List[str]): Numeric columns aggregated in each cell.
+        """
+
+        self.dimensions = list(dimensions)
+        self.measures = list(measures)
+        self.cells = self._aggregate(df)
+
+    def _aggregate(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Groups fact rows into cells.
+
+        Args:
+            df (pd.DataFrame): Fact rows containing dimensions and measures.
+
+        Returns:
+            pd.DataFrame: One row per observed dimension combination.
+        """
+
+        grouped = df.groupby(self.dimensions, observed=True, dropna=False)
+
+        cells = grouped[self.measures].sum()
+        counts = grouped[self.measures].count().add_suffix("__n")
+        cells = cells.join(counts)
+        cells[COUNT] = grouped.size()
+
+        return cells.reset_index()
+
+    def append(self, df: pd.DataFrame) -> "DataCube":
+        """
+        Returns a new cube that additionally covers the given fact rows.
+
+        Only the new rows are aggregated; their cells are then added onto the
+        existing ones, so the cost does not depend on the size of the table
+        the cube was originally built from.
+
+        Args:
+            df (pd.DataFrame): New fact rows with the cube's columns.
+
+        Returns:
+            DataCube: The updated cube. This cube is left unchanged.
+        """
+
+        cells = (
+            concat_frames([self.cells, self._aggregate(df)])
+            .groupby(self.dimensions, observed=True, dropna=False)
+            .sum()
+            .reset_index()
+        )
+        return DataCube.from_cells(cells, self.dimensions, self.measures)
+
+    @classmethod
+    def from_cells(
+        cls,
+        cells: pd.DataFrame,
+        dimensions: List[str],
+        measures: List[str],
+    ) -> "DataCube":
+        """
+        Creates a cube from cells aggregated elsewhere, e.g. by a database.
+
+        Args:
+            cells (pd.DataFrame): The dimensions, followed by the sum and the
+                "<measure>__n" non-null count of each measure and "count".
+            dimensions (List[str]): Columns the cube is grouped by.
+            measures (List[str]): Numeric columns aggregated in each cell.
+
+        Returns:
+            DataCube: The cube.
+        """
+
+        cube = cls.__new__(cls)
+        cube.dimensions = list(dimensions)
+        cube.measures = list(measures)
+        cube.cells = cells
+        return cube
+
+    def members(self, dimension: str) -> List[Hashable]:
+        """
+        Returns the sorted, non-null values a dimension takes in the cube.
+        """
+
+        return sorted(self.cells[dimension].dropna().unique())
+
+    def query(
+        self,
+        by: List[str],
+        measures: Dict[str, Tuple[str, str]],
+        where: Optional[Dict[str, object]] = None,
+    ) -> pd.DataFrame:
+        """
+        Answers a slice and rollup from the cube cells.
+
+        Args:
+            by (List[str]): Dimensions to keep in the result.
+            measures (Dict[str, Tuple[str, str]]): Maps each output column to
+                a (measure, aggregation) pair, with aggregation being "sum"
+                or "mean". Use the "count" measure for the number of rows.
+            where (Optional[Dict[str, object]]): Maps dimensions to a single
+                value or a list of accepted values.
+
+        Returns:
+            pd.DataFrame: The `by` dimensions followed by the measures.
+        """
+
+        cells = self.cells
+
+        if where:
+            mask = np.ones(len(cells), dtype=bool)
+            for dimension, value in where.items():
+                values = (
+                    value if isinstance(value, (list, tuple, set)) else [value]
+                )
+                mask &= isin_codes(cells[dimension], values)
+            cells = cells[mask]
+
+        needed = []
+        for measure, how in measures.values():
+            if how not in ("sum", "mean"):
+                raise ValueError(f"Unsupported aggregation: {how}")
+            needed.append(measure)
+            if how == "mean":
+                needed.append(f"{measure}__n")
+        needed = list(dict.fromkeys(needed))
+
+        if by:
+            rolled = cells.groupby(by, observed=True)[needed].sum()
+        else:
+            rolled = cells[needed].agg(["sum"])
+
+        result = pd.DataFrame(index=rolled.index)
+        for column, (measure, how) in measures.items():
+            if how == "sum":
+                result[column] = rolled[measure]
+            else:
+                result[column] = rolled[measure] / rolled[f"{measure}__n"]
+
+        return result.reset_index() if by else result.reset_index(drop=True)
@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+from urllib.request import urlopen
+
+from config import GEO_CACHE_DIR, GEO_PRECISION, GEO_REGIONS, GEO_TOLERANCE
+
+Ring = List[List[float]]
+
+# Seconds a download of region boundaries may take
+DOWNLOAD_TIMEOUT = 30
+
+
+def _perpendicular_distance(point, start, end) -> float:
+    """
+    Returns the distance of a point from the line through start and end.
+    """
+
+    (x, y), (x1, y1), (x2, y2) = point, start, end
+    dx, dy = x2 - x1, y2 - y1
+    if dx == 0 and dy == 0:
+        return ((x - x1) ** 2 + (y - y1) ** 2) ** 0.5
+    return abs(dy * x - dx * y + x2 * y1 - y2 * x1) / (dx**2 + dy**2) ** 0.5
+
+
+def simplify_ring(ring: Ring, tolerance: float) -> Ring:
+    """
+    Reduces the vertices of a closed ring with the Douglas-Peucker algorithm.
+
+    Args:
+        ring (Ring): The ring's [lon, lat] positions, first equal to last.
+        tolerance (float): Maximum deviation in degrees a dropped vertex may
+            have from the simplified outline.
+
+    Returns:
+        Ring: The simplified ring. Rings that would collapse below four
+        positions are returned unchanged.
+    """
+
+    if tolerance <= 0 or len(ring) <= 4:
+        return ring
+
+    keep = [False] * len(ring)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(ring) - 1)]
+
+    while stack:
+        first, last = stack.pop()
+        max_distance, index = 0.0, first
+        for i in range(first + 1, last):
+            distance = _perpendicular_distance(
+                ring[i], ring[first], ring[last]
+            )
+            if distance > max_distance:
+                max_distance, index = distance, i
+        if max_distance > tolerance:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    simplified = [point for point, kept in zip(ring, keep) if kept]
+    return simplified if len(simplified) >= 4 else ring
+
+
+def simplify_geojson(geojson: dict, tolerance: float, precision: int) -> dict:
+    """
+    Simplifies every polygon ring of a FeatureCollection and rounds its
+    coordinates, which shrinks the payload sent to the browser.
+
+    Args:
+        geojson (dict): A FeatureCollection of Polygons and MultiPolygons.
+        tolerance (float): See simplify_ring.
+        precision (int): Decimal places kept for each coordinate.
+
+    Returns:
+        dict: The simplified FeatureCollection.
+    """
+
+    def _ring(ring: Ring) -> Ring:
+        return [
+            [round(coordinate, precision) for coordinate in point]
+            for point in simplify_ring(ring, tolerance)
+        ]
+
+    for feature in geojson["features"]:
+        geometry = feature["geometry"]
+        if geometry["type"] == "Polygon":
+            geometry["coordinates"] = [
+                _ring(ring) for ring in geometry["coordinates"]
+            ]
+        elif geometry["type"] == "MultiPolygon":
+            geometry["coordinates"] = [
+                [_ring(ring) for ring in polygon]
+                for polygon in geometry["coordinates"]
+            ]
+
+    return geojson
+
+
+class GeoJSONStore:
+    """
+    A process-wide store for region boundaries keyed by region level
+    (e.g. "state").
+
+    Each level is read from its bundled path or downloaded from its URL once,
+    simplified, written to the cache directory and afterwards served from
+    memory, so map reruns neither hit the network nor re-parse the file.
+    """
+
+    def __init__(
+        self,
+        regions: Dict[str, dict] = GEO_REGIONS,
+        cache_dir: str = GEO_CACHE_DIR,
+        tolerance: float = GEO_TOLERANCE,
+        precision: int = GEO_PRECISION,
+    ):
+        """
+        Args:
+            regions (Dict[str, dict]): Maps each region level to its source
+                ("path" and/or "url") and "featureidkey".
+            cache_dir (str): Directory for the simplified GeoJSON files.
+            tolerance (float): Simplification tolerance in degrees.
+            precision (int): Decimal places kept for each coordinate.
+        """
+
+        self.regions = regions
+        self.cache_dir = cache_dir
+        self.tolerance = tolerance
+        self.precision = precision
+        self._geojson: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def featureidkey(self, level: str) -> str:
+        """
+        Returns the feature property the data locations are matched against.
+        """
+
+        return self.regions[level]["featureidkey"]
+
+    def _cache_path(self, level: str) -> str:
+        """
+        Returns the cache file of a level. Its name covers the source and the
+        simplification, so changing either in config.yaml (or replacing the
+        bundled file) simplifies the boundaries again.
+        """
+
+        region = self.regions[level]
+        path: Optional[str] = region.get("path")
+        source = [path, region.get("url")]
+        if path and os.path.exists(path):
+            source.append(os.path.getmtime(path))
+        digest = hashlib.sha1(json.dumps(source).encode()).hexdigest()[:12]
+        return os.path.join(
+            self.cache_dir,
+            f"{level}-{digest}-t{self.tolerance}-p{self.precision}.json",
+        )
+
+    def _read_source(self, level: str) -> dict:
+        """
+        Reads the original GeoJSON of a level from its bundled path, falling
+        back to downloading it from its URL.
+        """
+
+        region = self.regions[level]
+        path: Optional[str] = region.get("path")
+
+        if path and os.path.exists(path):
+            with open(path, "r") as file:
+                return json.load(file)
+
+        with urlopen(region["url"], timeout=DOWNLOAD_TIMEOUT) as response:
+            return json.load(response)
+
+    def get(self, level: str) -> dict:
+        """
+        Returns the simplified GeoJSON FeatureCollection for a region level.
+
+        Args:
+            level (str): A level configured under geo.regions in config.yaml.
+
+        Returns:
+            dict: The shared FeatureCollection. Callers must not mutate it.
+        """
+
+        with self._lock:
+            if level in self._geojson:
+                return self._geojson[level]
+
+        # Read outside the lock, so a slow download does not block the
+        # levels already loaded; concurrent first calls may read twice
+        cache_path = self._cache_path(level)
+        if os.path.exists(cache_path):
+            with open(cache_path, "r") as file:
+                geojson = json.load(file)
+        else:
+            geojson = simplify_geojson(
+                self._read_source(level), self.tolerance, self.precision
+            )
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = (
+                f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            )
+            with open(tmp_path, "w") as file:
+                json.dump(geojson, file, separators=(",", ":"))
+            os.replace(tmp_path, cache_path)
+
+        with self._lock:
+            return self._geojson.setdefault(level, geojson)
+
+
+geojson_store = GeoJSONStore()
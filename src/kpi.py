@@ -0,0 +1,313 @@
+import datetime
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from loader import DataLoader
+from utils.lru import LRUCache
+from utils.perf import timed
+
+# Number of comparisons kept by the KPI cache
+CACHE_SIZE = 256
+
+
+@dataclass(frozen=True)
+class Period:
+    """
+    A range of order days, both ends inclusive.
+    """
+
+    start: datetime.date
+    end: datetime.date
+    label: str
+
+    def is_calendar_year(self) -> bool:
+        return self.start == datetime.date(
+            self.start.year, 1, 1
+        ) and self.end == datetime.date(self.start.year, 12, 31)
+
+
+def _same_day(day: datetime.date, year: int) -> datetime.date:
+    """
+    Returns the same day in another year, Feb 29 becoming Feb 28.
+    """
+
+    if day.month == 2 and day.day == 29:
+        return datetime.date(year, 2, 28)
+    return day.replace(year=year)
+
+
+def _month_end(year: int, month: int) -> datetime.date:
+    if month == 12:
+        return datetime.date(year, 12, 31)
+    return datetime.date(year, month + 1, 1) - datetime.timedelta(days=1)
+
+
+def periods(
+    kind: str, anchor: datetime.date, days: Optional[int] = None
+) -> Tuple[Period, Period]:
+    """
+    Returns a period containing `anchor` and the one it is compared to.
+
+    Args:
+        kind (str): "year", "quarter" or "month" for the calendar period of
+            the anchor and the one before, "ytd" for the year to date and
+            the same days of the prior year, or "rolling" for the `days`
+            days up to the anchor and the `days` days before them.
+        anchor (datetime.date): A day of the current period, e.g. the last
+            order day.
+        days (Optional[int]): The length of rolling windows.
+
+    Returns:
+        Tuple[Period, Period]: The current and the previous period.
+    """
+
+    year = anchor.year
+
+    if kind == "year":
+        return (
+            Period(
+                datetime.date(year, 1, 1),
+                datetime.date(year, 12, 31),
+                str(year),
+            ),
+            Period(
+                datetime.date(year - 1, 1, 1),
+                datetime.date(year - 1, 12, 31),
+                str(year - 1),
+            ),
+        )
+
+    if kind == "quarter":
+        quarter = (anchor.month - 1) // 3
+        previous_year, previous_quarter = divmod(year * 4 + quarter - 1, 4)
+        return tuple(
+            Period(
+                datetime.date(y, q * 3 + 1, 1),
+                _month_end(y, q * 3 + 3),
+                f"Q{q + 1} {y}",
+            )
+            for y, q in ((year, quarter), (previous_year, previous_quarter))
+        )
+
+    if kind == "month":
+        previous_year, previous_month = divmod(
+            year * 12 + anchor.month - 2, 12
+        )
+        return tuple(
+            Period(datetime.date(y, m, 1), _month_end(y, m), f"{y}-{m:02d}")
+            for y, m in (
+                (year, anchor.month),
+                (previous_year, previous_month + 1),
+            )
+        )
+
+    if kind == "ytd":
+        prior_anchor = _same_day(anchor, year - 1)
+        return (
+            Period(datetime.date(year, 1, 1), anchor, f"YTD {year}"),
+            Period(
+                datetime.date(year - 1, 1, 1), prior_anchor, f"YTD {year - 1}"
+            ),
+        )
+
+    if kind == "rolling":
+        if not days or days < 1:
+            raise ValueError("Rolling periods need a positive number of days")
+        window = datetime.timedelta(days=days)
+        start = anchor - window + datetime.timedelta(days=1)
+        return (
+            Period(start, anchor, f"Last {days} days"),
+            Period(
+                start - window,
+                start - datetime.timedelta(days=1),
+                f"Previous {days} days",
+            ),
+        )
+
+    raise ValueError(f"Unknown period kind: {kind}")
+
+
+def _label_rows(order_dates: pd.Series, compared: List[Period]) -> np.ndarray:
+    """
+    Returns the index of the period each row belongs to, -1 for none.
+
+    One binary search per row against the sorted period edges, however many
+    periods are compared.
+    """
+
+    by_start = sorted(range(len(compared)), key=lambda i: compared[i].start)
+    edges = []
+    for i in by_start:
+        start = np.datetime64(compared[i].start, "ns")
+        stop = np.datetime64(
+            compared[i].end + datetime.timedelta(days=1), "ns"
+        )
+        if edges and start < edges[-1]:
+            raise ValueError("Compared periods must not overlap")
+        edges += [start, stop]
+
+    positions = np.searchsorted(
+        np.array(edges), order_dates.to_numpy(), side="right"
+    )
+    inside = positions % 2 == 1
+    labels = np.full(len(positions), -1)
+    labels[inside] = np.asarray(by_start)[(positions[inside] - 1) // 2]
+    return labels
+
+
+class KpiEngine:
+    """
+    Computes measures for pairs of periods with one grouped pass over the
+    prepared data, or from the cube for calendar years. Results are cached
+    per data version.
+    """
+
+    def __init__(self, max_entries: int = CACHE_SIZE):
+        """
+        Args:
+            max_entries (int): Number of comparisons kept.
+        """
+
+        self.max_entries = max_entries
+        self._entries = LRUCache(max_entries)
+
+    def compare(
+        self,
+        loader: DataLoader,
+        measures: Dict[str, Tuple[str, str]],
+        current: Period,
+        previous: Period,
+    ) -> pd.DataFrame:
+        """
+        Computes measures for two periods and their differences.
+
+        Args:
+            loader (DataLoader): The loaded dataset.
+            measures (Dict[str, Tuple[str, str]]): Maps each KPI to a
+                (column, aggregation) pair, with aggregation being "sum" or
+                "mean". Use ("count", "sum") for the number of rows.
+            current (Period): The period of interest.
+            previous (Period): The period it is compared to.
+
+        Returns:
+            pd.DataFrame: One row per KPI with the "current" and "previous"
+            values, their "delta" and the relative "delta_pct" (NaN if the
+            previous value is 0). Callers must not mutate it.
+        """
+
+        key = (loader.version, tuple(measures.items()), current, previous)
+        result = self._entries.get(key)
+        if result is not None:
+            return result
+
+        values = self._aggregate(loader, measures, [current, previous])
+        result = pd.DataFrame(
+            {"current": values[0], "previous": values[1]},
+            index=pd.Index(list(measures), name="kpi"),
+        )
+        result["delta"] = result["current"] - result["previous"]
+        result["delta_pct"] = result["delta"] / result["previous"].replace(
+            0, np.nan
+        )
+
+        return self._entries.put(key, result)
+
+    def clear(self):
+        """
+        Drops all cached comparisons.
+        """
+
+        self._entries.clear()
+
+    @timed("kpi.aggregate")
+    def _aggregate(
+        self,
+        loader: DataLoader,
+        measures: Dict[str, Tuple[str, str]],
+        compared: List[Period],
+    ) -> List[List[float]]:
+        """
+        Returns the value of every measure for every period.
+        """
+
+        for column, how in measures.values():
+            if how not in ("sum", "mean"):
+                raise ValueError(f"Unsupported aggregation: {how}")
+            if column == "count" and how != "sum":
+                raise ValueError("The row count can only be summed")
+
+        columns = list(
+            dict.fromkeys(column for column, _ in measures.values())
+        )
+
+        if all(period.is_calendar_year() for period in compared) and set(
+            columns
+        ) <= set(loader.cube.measures + ["count"]):
+            return self._aggregate_cube(loader, measures, compared)
+
+        stored = [column for column in columns if column != "count"]
+        first = min(period.start for period in compared)
+        last = max(period.end for period in compared)
+        df = loader.get_data_for_metric(
+            ["Order Date"] + stored, date_range=(first, last)
+        )
+
+        labels = _label_rows(df["Order Date"], compared)
+        grouped = df[stored].groupby(labels)
+        sums = grouped.sum()
+        counts = grouped.count()
+        sizes = grouped.size()
+
+        values = []
+        for i in range(len(compared)):
+            row = []
+            for column, how in measures.values():
+                if column == "count":
+                    total, count = sizes.get(i, 0), 1
+                elif i in sums.index:
+                    total = sums.at[i, column]
+                    count = counts.at[i, column]
+                else:
+                    total, count = 0.0, 0
+                if how == "sum":
+                    row.append(float(total))
+                else:
+                    row.append(float(total) / count if count else np.nan)
+            values.append(row)
+        return values
+
+    @staticmethod
+    def _aggregate_cube(
+        loader: DataLoader,
+        measures: Dict[str, Tuple[str, str]],
+        compared: List[Period],
+    ) -> List[List[float]]:
+        """
+        Reads calendar years from the cube, without touching the rows.
+        """
+
+        years = [period.start.year for period in compared]
+        # Positional output names, which cannot clash with the cube's columns
+        names = {f"m{i}": spec for i, spec in enumerate(measures.values())}
+        rolled = loader.cube.query(
+            by=["year"], measures=names, where={"year": years}
+        ).set_index("year")
+
+        values = []
+        for year in years:
+            if year in rolled.index:
+                values.append([float(rolled.at[year, n]) for n in names])
+            else:
+                values.append(
+                    [
+                        0.0 if how == "sum" else np.nan
+                        for _, how in measures.values()
+                    ]
+                )
+        return values
+
+
+kpi_engine = KpiEngine()
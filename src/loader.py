@@ -1,60 +1,959 @@
-from typing import List
+import datetime
+import itertools
+import os
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
 
-import kagglehub
+import numpy as np
 import pandas as pd
-from kagglehub import KaggleDatasetAdapter
+import pyarrow as pa
+import pyarrow.feather as feather
 
-from config import DATASET_FILE, DATASET_NAME
+from config import (
+    CATEGORICAL_COLUMNS,
+    CHUNKSIZE,
+    COLUMN_DTYPES,
+    COLUMNS_BARPLOT,
+    COLUMNS_BENTBOXES,
+    COLUMNS_GEOMAP,
+    COLUMNS_LINECHART,
+    COLUMNS_PIECHART,
+    CUBE_DIMENSIONS,
+    CUBE_MEASURES,
+    DATASET_CACHE_TTL,
+    DATE_COLUMNS,
+    INCREMENTAL_LOADING,
+    KEEP_ROWS,
+    LAZY_COLUMNS,
+    SNAPSHOT_DIR,
+)
+from cube import DataCube
+from metrics import DATASET_CACHE_REQUESTS, DATASET_LOAD_SECONDS
+from sources import DataSource, create_source
+from utils.frames import concat_frames, sort_categories
+from utils.perf import timed
+
+# With Copy-on-Write, projections of the shared fact table are handed out
+# without copying and only columns a page writes to get copied. It is
+# always enabled from pandas 3.0 on.
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+DateLike = Union[str, datetime.date, pd.Timestamp]
+
+_SNAPSHOT_SOURCE_KEY = b"dashboard.source_signature"
+# Bump whenever _prepare changes, so existing snapshots are rebuilt
+_SNAPSHOT_VERSION = 6
+# Number of bytes before the last read offset compared to detect appends
+_SOURCE_TAIL_SIZE = 4096
+
+
+def _file_signature(path: str) -> Tuple[int, int]:
+    """
+    Returns the (modification time, size) pair identifying a file version.
+    """
+
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+@dataclass
+class Dataset:
+    """
+    The prepared fact table together with the aggregates derived from it.
+    """
+
+    # None for sources that answer queries themselves (pushdown)
+    df: Optional[pd.DataFrame]
+    cube: DataCube
+    # Bytes of the source file covered by the dataset and the bytes just
+    # before that offset, used to recognise pure appends to the file
+    source_offset: int = 0
+    source_tail: bytes = b""
+    # The distinct order days, kept instead of the rows when the file is only
+    # streamed into the cube
+    order_days: Optional[np.ndarray] = None
+    # Identifies the rows the dataset holds; appends and reloads get a new
+    # version, while added columns keep it (see dataclasses.replace)
+    version: int = field(default_factory=itertools.count().__next__)
+
+
+@dataclass
+class _CacheEntry:
+    """
+    A single dataset held by the DatasetCache.
+    """
+
+    dataset: Dataset
+    path: str
+    signature: Tuple[int, int]
+    checked_at: float
+
+
+class DatasetCache:
+    """
+    A process-wide, thread-safe cache that parses each dataset file once and
+    shares the resulting Dataset across all sessions and pages.
+
+    Entries are trusted for `ttl` seconds. After that the source path is
+    resolved again and the file is only re-parsed if its modification time
+    or size changed. If an `append` callback is given it is tried first, so
+    rows appended to the file can be merged without a full reload.
+    """
+
+    def __init__(self, ttl: Optional[float] = DATASET_CACHE_TTL):
+        """
+        Args:
+            ttl (Optional[float]): Seconds an entry is served without checking
+                the source file. None disables re-checking entirely.
+        """
+
+        self.ttl = ttl
+        self._entries: Dict[str, _CacheEntry] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        key: str,
+        resolve: Callable[[], str],
+        load: Callable[[str], Dataset],
+        append: Optional[Callable[[Dataset, str], Optional[Dataset]]] = None,
+    ) -> Dataset:
+        """
+        Returns the cached Dataset for `key`, loading it if necessary.
+
+        Args:
+            key (str): The name of the data source.
+            resolve (Callable[[], str]): Returns the local path of the file.
+            load (Callable[[str], Dataset]): Builds the Dataset from a path.
+            append (Optional[Callable[[Dataset, str], Optional[Dataset]]]):
+                Extends a cached Dataset with the rows added to the file at a
+                path, returning None if the file was not simply appended to.
+
+        Returns:
+            Dataset: The shared Dataset. Callers must not mutate it.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            now = time.monotonic()
+
+            if entry is not None and (
+                self.ttl is None or now - entry.checked_at < self.ttl
+            ):
+                DATASET_CACHE_REQUESTS.inc(result="hit")
+                return entry.dataset
+
+            path = resolve()
+            signature = _file_signature(path)
+
+            if entry is not None and entry.signature == signature:
+                entry.path = path
+                entry.checked_at = now
+                DATASET_CACHE_REQUESTS.inc(result="revalidated")
+                return entry.dataset
+
+            dataset = None
+            if entry is not None and append is not None:
+                with DATASET_LOAD_SECONDS.time(kind="append"):
+                    dataset = append(entry.dataset, path)
+            if dataset is None:
+                DATASET_CACHE_REQUESTS.inc(result="miss")
+                with DATASET_LOAD_SECONDS.time(kind="full"):
+                    dataset = load(path)
+            else:
+                DATASET_CACHE_REQUESTS.inc(result="append")
+            self._entries[key] = _CacheEntry(dataset, path, signature, now)
+            return dataset
+
+    def extend(
+        self,
+        key: str,
+        resolve: Callable[[], str],
+        load: Callable[[str], Dataset],
+        extend: Callable[[Dataset, str], Dataset],
+    ) -> Dataset:
+        """
+        Replaces the cached Dataset for `key` with an extended one, e.g. one
+        with additional columns.
+
+        If the file changed since the Dataset was loaded, it is reloaded
+        first, so the extension reads the same file version as the cached
+        rows were read from.
+
+        Args:
+            key (str): The name of the data source.
+            resolve (Callable[[], str]): Returns the local path of the file.
+            load (Callable[[str], Dataset]): Builds the Dataset from a path.
+            extend (Callable[[Dataset, str], Dataset]): Returns the extended
+                Dataset, given the cached one and the path of its file.
+
+        Returns:
+            Dataset: The extended, shared Dataset.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            path = resolve() if entry is None else entry.path
+            signature = _file_signature(path)
+
+            if entry is None or entry.signature != signature:
+                with DATASET_LOAD_SECONDS.time(kind="full"):
+                    dataset = load(path)
+                entry = _CacheEntry(dataset, path, signature, time.monotonic())
+                self._entries[key] = entry
+
+            with DATASET_LOAD_SECONDS.time(kind="columns"):
+                entry.dataset = extend(entry.dataset, path)
+            return entry.dataset
+
+    def invalidate(self, key: Optional[str] = None):
+        """
+        Drops one entry, or every entry if no key is given.
+        """
+
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+dataset_cache = DatasetCache()
+
+# Columns added to the fact table by DataLoader._prepare, and the stored
+# columns each of them is derived from
+DERIVED_COLUMNS = {
+    "year": ["Order Date"],
+    "month": ["Order Date"],
+    "week": ["Order Date"],
+    "ship_year": ["Ship Date"],
+    "profit_margin": ["Profit", "Sales"],
+}
+
+
+def stored_columns(columns: List[str]) -> List[str]:
+    """
+    Replaces derived columns by the stored columns they are derived from.
+    """
+
+    stored = []
+    for column in columns:
+        stored.extend(DERIVED_COLUMNS.get(column, [column]))
+    return list(dict.fromkeys(stored))
+
+
+# Stored columns the cube is built from, plus the order date the rows are
+# sorted by
+CORE_COLUMNS = stored_columns(CUBE_DIMENSIONS + CUBE_MEASURES + ["Order Date"])
+# Stored columns referenced by a page or the cube, the only ones read from
+# the source unless they are loaded lazily
+CONFIGURED_COLUMNS = stored_columns(
+    COLUMNS_PIECHART
+    + COLUMNS_BARPLOT
+    + COLUMNS_GEOMAP
+    + COLUMNS_LINECHART
+    + COLUMNS_BENTBOXES
+    + CORE_COLUMNS
+)
 
 
 class DataLoader:
     """
-    A class to load a Kaggle dataset into a pandas DataFrame and provide methods
-    to access data for specific metrics.
+    A class to load the Superstore dataset from a DataSource into a pandas
+    DataFrame and provide methods to access data for specific metrics.
+
+    For sources that support pushdown (e.g. SQLite) no DataFrame is held;
+    page queries and the cube aggregation run inside the source instead.
+    The same holds for sources streamed with `keep_rows` disabled, whose
+    page queries scan the file again chunk by chunk.
     """
 
+    @timed("loader.init")
     def __init__(
         self,
-        dataset_name: str = DATASET_NAME,
-        dataset_file: str = DATASET_FILE,
+        source: Optional[DataSource] = None,
+        cache: DatasetCache = dataset_cache,
+        snapshot_dir: Optional[str] = SNAPSHOT_DIR,
+        incremental: bool = INCREMENTAL_LOADING,
+        chunksize: Optional[int] = CHUNKSIZE,
+        keep_rows: bool = KEEP_ROWS,
+        lazy_columns: bool = LAZY_COLUMNS,
     ):
         """
         Initializes the DataLoader by downloading the dataset (if necessary)
-        and loading it into a pandas DataFrame.
+        and loading it into a pandas DataFrame. The DataFrame and its cube are
+        shared through the process-wide cache, so only the first loader
+        parses the file.
 
         Args:
-            dataset_name (str): The name of the Kaggle dataset (e.g., 'username/dataset-name').
-            dataset_file (str): The name of the file within the dataset to load (e.g., 'data.csv').
+            source (Optional[DataSource]): Where the rows are read from.
+                Defaults to the source configured in config.yaml.
+            cache (DatasetCache): The cache the Dataset is shared through.
+            snapshot_dir (Optional[str]): Directory for typed Feather
+                snapshots of the dataset. None disables snapshots.
+            incremental (bool): Merge rows appended to the dataset file into
+                the cached Dataset instead of reloading the whole file.
+            chunksize (Optional[int]): Stream the source in chunks of this
+                many rows. None reads the whole file at once.
+            keep_rows (bool): With chunksize set, whether the rows are held
+                in memory or only folded into the cube.
+            lazy_columns (bool): Read only CORE_COLUMNS up front and any
+                other column the first time it is requested, instead of
+                reading all CONFIGURED_COLUMNS.
+        """
+
+        self.source = source if source is not None else create_source()
+        self.cache = cache
+        self.chunksize = chunksize
+        self.columns = CORE_COLUMNS if lazy_columns else CONFIGURED_COLUMNS
+        self.keep_rows = keep_rows or chunksize is None
+        self.snapshot_dir = (
+            None
+            if self.source.supports_pushdown or not self.keep_rows
+            else snapshot_dir
+        )
+        dataset = cache.get(
+            self.source.name,
+            self.source.resolve,
+            self._load_dataset,
+            self._append_dataset
+            if incremental and self.source.supports_append
+            else None,
+        )
+        self.df = dataset.df
+        self.cube = dataset.cube
+        self.order_days = dataset.order_days
+        self.version = dataset.version
+
+    def _snapshot_path(self) -> str:
+        """
+        Returns the path of the Feather snapshot for this data source.
+        """
+
+        name = re.sub(r"[^A-Za-z0-9._-]+", "__", self.source.name)
+        return os.path.join(self.snapshot_dir, f"{name}.feather")
+
+    @timed("loader.load_dataset")
+    def _load_dataset(self, path: str) -> Dataset:
+        """
+        Loads the fact table and builds the aggregate cube from it.
+
+        Args:
+            path (str): The local path of the dataset file.
+
+        Returns:
+            Dataset: The fact table and its cube.
+        """
+
+        if self.source.supports_pushdown:
+            cells = self.source.aggregate(path, CUBE_DIMENSIONS, CUBE_MEASURES)
+            for column in CATEGORICAL_COLUMNS:
+                if column in cells.columns:
+                    cells[column] = cells[column].astype("category")
+            return Dataset(
+                None,
+                DataCube.from_cells(cells, CUBE_DIMENSIONS, CUBE_MEASURES),
+            )
+
+        offset = os.path.getsize(path)
+        tail = self._read_tail(path, offset)
+
+        if not self.keep_rows:
+            cube, order_days = self._stream_aggregates(path)
+            return Dataset(None, cube, offset, tail, order_days)
+
+        df = self._load_dataframe(path)
+
+        return Dataset(
+            df, DataCube(df, CUBE_DIMENSIONS, CUBE_MEASURES), offset, tail
+        )
+
+    def _read_chunks(
+        self, path: str, columns: List[str]
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Streams the source in chunks and prepares each of them, without
+        sorting.
+
+        Args:
+            path (str): The local path of the dataset file.
+            columns (List[str]): The stored columns to read.
+
+        Returns:
+            Iterator[pd.DataFrame]: The prepared chunks, in file order.
+        """
+
+        for chunk in self.source.read_chunks(path, columns, self.chunksize):
+            yield self._prepare(chunk, sort=False)
+
+    @timed("loader.stream_aggregates")
+    def _stream_aggregates(self, path: str) -> Tuple[DataCube, np.ndarray]:
         """
+        Folds the source into the cube chunk by chunk, so only one chunk of
+        rows is held in memory at a time.
 
-        self.dataset_name = dataset_name
-        self.dataset_file = dataset_file
-        self.df = self._load_dataframe()
+        Args:
+            path (str): The local path of the dataset file.
+
+        Returns:
+            Tuple[DataCube, np.ndarray]: The cube and the distinct order days.
+        """
+
+        cube = None
+        days = []
+        for chunk in self._read_chunks(path, CORE_COLUMNS):
+            if cube is None:
+                cube = DataCube(chunk, CUBE_DIMENSIONS, CUBE_MEASURES)
+            else:
+                cube = cube.append(chunk)
+            days.append(np.unique(chunk["Order Date"].to_numpy()))
+
+        if cube is None:
+            raise ValueError(f"The dataset file {path} holds no rows")
+
+        return (
+            DataCube.from_cells(
+                sort_categories(cube.cells), CUBE_DIMENSIONS, CUBE_MEASURES
+            ),
+            np.unique(np.concatenate(days)),
+        )
+
+    @staticmethod
+    def _read_tail(path: str, offset: int) -> bytes:
+        """
+        Returns the bytes of a file just before the given offset.
+        """
+
+        with open(path, "rb") as file:
+            file.seek(max(offset - _SOURCE_TAIL_SIZE, 0))
+            return file.read(min(offset, _SOURCE_TAIL_SIZE))
+
+    @staticmethod
+    def _line_end(path: str, start: int, end: int) -> int:
+        """
+        Returns the offset just after the last line break between two
+        offsets, or `start` if there is none.
+        """
+
+        with open(path, "rb") as file:
+            while end > start:
+                block = max(end - _SOURCE_TAIL_SIZE, start)
+                file.seek(block)
+                index = file.read(end - block).rfind(b"\n")
+                if index >= 0:
+                    return block + index + 1
+                end = block
+        return start
+
+    @timed("loader.append_dataset")
+    def _append_dataset(
+        self, dataset: Dataset, path: str
+    ) -> Optional[Dataset]:
+        """
+        Extends a Dataset with the rows appended to its file since it was
+        loaded. Only the new bytes are parsed, and the cube is updated from
+        the new rows alone.
+
+        Args:
+            dataset (Dataset): The cached Dataset.
+            path (str): The local path of the dataset file.
+
+        Returns:
+            Optional[Dataset]: The extended Dataset, or None if the file was
+            rewritten rather than appended to and needs a full reload.
+        """
+
+        size = os.path.getsize(path)
+        if (
+            size < dataset.source_offset
+            or not dataset.source_tail.endswith(b"\n")
+            or self._read_tail(path, dataset.source_offset)
+            != dataset.source_tail
+        ):
+            return None
+
+        # The writer may not have finished the last line yet; it is read
+        # with the next append, once its line break is there
+        offset = self._line_end(path, dataset.source_offset, size)
+        if offset == dataset.source_offset:
+            return dataset
+
+        delta = self.source.read_appended(
+            path,
+            dataset.source_offset,
+            offset,
+            CORE_COLUMNS if dataset.df is None else dataset.df.columns,
+        )
+
+        if not delta.empty:
+            delta = self._prepare(delta)
+
+        df, cube, order_days = dataset.df, dataset.cube, dataset.order_days
+        if not delta.empty:
+            # New values are appended to the dictionaries, which are sorted
+            # again like a full load would have
+            cube = DataCube.from_cells(
+                sort_categories(cube.append(delta).cells),
+                CUBE_DIMENSIONS,
+                CUBE_MEASURES,
+            )
+            if df is None:
+                order_days = np.union1d(
+                    order_days, delta["Order Date"].to_numpy()
+                )
+            else:
+                last_day = df["Order Date"].iloc[-1]
+                df = sort_categories(concat_frames([df, delta]))
+                if delta["Order Date"].iloc[0] < last_day:
+                    df = df.sort_values(
+                        "Order Date", kind="stable", ignore_index=True
+                    )
+
+        # A snapshot is tagged with the whole file, so it must hold every line
+        if self.snapshot_dir is not None and offset == size:
+            self._write_snapshot(
+                df, self._snapshot_path(), self._snapshot_signature(path)
+            )
+
+        return Dataset(
+            df, cube, offset, self._read_tail(path, offset), order_days
+        )
 
-    def _load_dataframe(self) -> pd.DataFrame:
+    def _snapshot_signature(self, path: str) -> bytes:
+        """
+        Returns the tag identifying the source file version (and the columns
+        read from it) a snapshot was written from.
+        """
+
+        return "v{}:{}:{}:{:08x}".format(
+            _SNAPSHOT_VERSION,
+            *_file_signature(path),
+            zlib.crc32("\0".join(self.columns).encode()),
+        ).encode()
+
+    def _load_dataframe(self, path: str) -> pd.DataFrame:
         """
         Loads the dataset file into a pandas DataFrame.
 
+        The prepared snapshot is memory-mapped if it was written from the
+        same version of the source file. Otherwise the source is read,
+        prepared and written back as a new snapshot.
+
+        Args:
+            path (str): The local path of the dataset file.
+
         Returns:
             pd.DataFrame: The loaded DataFrame.
         """
 
-        return kagglehub.load_dataset(
-            KaggleDatasetAdapter.PANDAS,
-            self.dataset_name,
-            self.dataset_file,
-            pandas_kwargs={"encoding": "latin-1"},
+        if self.snapshot_dir is None:
+            return self._read_source(path, self.columns)
+
+        signature = self._snapshot_signature(path)
+        snapshot_path = self._snapshot_path()
+
+        df = self._read_snapshot(snapshot_path, signature)
+        if df is None:
+            df = self._read_source(path, self.columns)
+            self._write_snapshot(df, snapshot_path, signature)
+
+        return df
+
+    @timed("loader.read_source")
+    def _read_source(self, path: str, columns: List[str]) -> pd.DataFrame:
+        """
+        Reads and prepares the fact table from the source, in one go or as
+        typed chunks.
+
+        Args:
+            path (str): The local path of the dataset file.
+            columns (List[str]): The stored columns to read.
+
+        Returns:
+            pd.DataFrame: The prepared fact table.
+        """
+
+        if self.chunksize is None:
+            return self._prepare(self.source.read(path, columns))
+
+        # Only the typed chunks are held, never the text of the whole file
+        df = sort_categories(
+            concat_frames(list(self._read_chunks(path, columns)))
         )
+        return df.sort_values("Order Date", kind="stable", ignore_index=True)
+
+    def _prepare(self, df: pd.DataFrame, sort: bool = True) -> pd.DataFrame:
+        """
+        Turns the raw source rows into the fact table shared by all pages.
 
-    def get_data_for_metric(self, columns: List[str]) -> pd.DataFrame:
+        Dates are parsed once (rows with an invalid order date are dropped),
+        low-cardinality string columns become categoricals, integer columns
+        are downcast, the derived columns listed in DERIVED_COLUMNS are added
+        and the rows are sorted by order date. Derived columns whose inputs
+        were not read are skipped.
+
+        Args:
+            df (pd.DataFrame): The DataFrame as read from the source.
+            sort (bool): Whether to sort the rows by order date.
+
+        Returns:
+            pd.DataFrame: The prepared fact table.
+        """
+
+        for column in DATE_COLUMNS:
+            if column in df.columns:
+                df[column] = self._parse_dates(df[column])
+
+        for column in CATEGORICAL_COLUMNS:
+            if column in df.columns:
+                df[column] = df[column].astype("category")
+
+        # Money columns stay float64, so sums match to the cent
+        for column in df.select_dtypes("integer").columns:
+            df[column] = pd.to_numeric(df[column], downcast="integer")
+
+        if "Order Date" in df.columns:
+            df = df.dropna(subset=["Order Date"])
+
+            order_date = df["Order Date"].dt
+            df["year"] = order_date.year.astype("int16")
+            df["month"] = order_date.month.astype("int8")
+            df["week"] = order_date.isocalendar().week.astype("int8")
+
+        if "Ship Date" in df.columns:
+            df["ship_year"] = df["Ship Date"].dt.year.astype("Int16")
+
+        if "Profit" in df.columns and "Sales" in df.columns:
+            df["profit_margin"] = df["Profit"] / df["Sales"] * 100
+
+        if not sort or "Order Date" not in df.columns:
+            return df
+
+        # Keeping the rows ordered by date lets date ranges be sliced with a
+        # binary search instead of a full boolean mask
+        return df.sort_values("Order Date", kind="stable", ignore_index=True)
+
+    @timed("loader.parse_dates")
+    def _parse_dates(self, dates: pd.Series) -> pd.Series:
+        """
+        Parses a column of date strings, each distinct day only once.
+
+        Args:
+            dates (pd.Series): Date strings, ideally read as a categorical.
+
+        Returns:
+            pd.Series: The dates, NaT where a string is not a valid date.
+        """
+
+        if not isinstance(dates.dtype, pd.CategoricalDtype):
+            dates = dates.astype("category")
+
+        days = pd.to_datetime(
+            dates.cat.categories,
+            format=self.source.date_format,
+            errors="coerce",
+        ).to_numpy()
+        codes = dates.cat.codes.to_numpy()
+
+        values = days[codes]
+        values[codes == -1] = None
+        return pd.Series(values, index=dates.index, name=dates.name)
+
+    @staticmethod
+    @timed("loader.read_snapshot")
+    def _read_snapshot(
+        snapshot_path: str, signature: bytes
+    ) -> Optional[pd.DataFrame]:
+        """
+        Memory-maps a snapshot if it matches the given source signature.
+
+        Args:
+            snapshot_path (str): The path of the Feather snapshot.
+            signature (bytes): The signature of the current source file.
+
+        Returns:
+            Optional[pd.DataFrame]: The snapshot, or None if it is missing,
+            unreadable or stale.
+        """
+
+        if not os.path.exists(snapshot_path):
+            return None
+
+        try:
+            table = feather.read_table(snapshot_path, memory_map=True)
+        except (OSError, pa.ArrowInvalid):
+            return None
+
+        metadata = table.schema.metadata or {}
+        if metadata.get(_SNAPSHOT_SOURCE_KEY) != signature:
+            return None
+
+        # split_blocks keeps the numeric and date columns as zero-copy views
+        # on the map (see _write_snapshot); the codes of categorical columns
+        # and columns with missing values are copied, at 1-3 bytes per row
+        df = table.to_pandas(split_blocks=True)
+
+        # Arrow drops the nullable dtypes of categories, e.g. of Postal Code
+        for column, dtype in COLUMN_DTYPES.items():
+            if column in df.columns and isinstance(
+                df[column].dtype, pd.CategoricalDtype
+            ):
+                categories = df[column].cat.categories
+                if categories.dtype != dtype:
+                    df[column] = df[column].cat.rename_categories(
+                        categories.astype(dtype)
+                    )
+        return df
+
+    @staticmethod
+    @timed("loader.write_snapshot")
+    def _write_snapshot(
+        df: pd.DataFrame, snapshot_path: str, signature: bytes
+    ):
+        """
+        Writes the DataFrame as an uncompressed Feather file, so it can be
+        memory-mapped, tagged with the signature of its source file.
+
+        Args:
+            df (pd.DataFrame): The typed DataFrame.
+            snapshot_path (str): The path of the Feather snapshot.
+            signature (bytes): The signature of the source file.
+        """
+
+        # A single record batch keeps every column one contiguous buffer,
+        # which reading it back can map instead of concatenating the batches
+        table = pa.Table.from_pandas(df, preserve_index=False).combine_chunks()
+        table = table.replace_schema_metadata(
+            {**(table.schema.metadata or {}), _SNAPSHOT_SOURCE_KEY: signature}
+        )
+
+        os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+        tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+        feather.write_feather(
+            table,
+            tmp_path,
+            compression="uncompressed",
+            chunksize=max(table.num_rows, 1),
+        )
+        os.replace(tmp_path, snapshot_path)
+
+    def _date_slice(
+        self,
+        start: DateLike,
+        end: DateLike,
+        order_dates: Optional[np.ndarray] = None,
+    ) -> slice:
+        """
+        Finds the rows ordered between two dates with a binary search on the
+        sorted "Order Date" column.
+
+        Args:
+            start (DateLike): The first day of the range.
+            end (DateLike): The last day of the range (inclusive).
+            order_dates (Optional[np.ndarray]): Sorted dates to search
+                instead of the fact table's order dates.
+
+        Returns:
+            slice: The positional slice of the matching rows.
+        """
+
+        if order_dates is None:
+            order_dates = self.df["Order Date"].to_numpy()
+        start = pd.Timestamp(start).normalize().to_datetime64()
+        stop = (
+            pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+        ).to_datetime64()
+
+        return slice(
+            order_dates.searchsorted(start, side="left"),
+            order_dates.searchsorted(stop, side="left"),
+        )
+
+    def get_date_bounds(
+        self, year: Optional[int] = None
+    ) -> Tuple[datetime.date, datetime.date]:
+        """
+        Returns the first and last order date, optionally within one year.
+
+        Args:
+            year (Optional[int]): Restricts the bounds to this year.
+
+        Returns:
+            Tuple[datetime.date, datetime.date]: The first and last day.
+
+        Raises:
+            ValueError: If there are no orders (in that year).
+        """
+
+        if self.df is None and self.order_days is None:
+            return self.source.date_bounds(self.source.resolve(), year)
+
+        if self.df is None:
+            order_dates = pd.Series(self.order_days)
+        else:
+            order_dates = self.df["Order Date"]
+
+        if year is not None:
+            order_dates = order_dates.iloc[
+                self._date_slice(
+                    f"{year}-01-01", f"{year}-12-31", order_dates.to_numpy()
+                )
+            ]
+        if order_dates.empty:
+            raise ValueError(
+                "No orders" if year is None else f"No orders in {year}"
+            )
+
+        return order_dates.iloc[0].date(), order_dates.iloc[-1].date()
+
+    @timed("loader.get_data_for_metric")
+    def get_data_for_metric(
+        self,
+        columns: List[str],
+        date_range: Optional[Tuple[DateLike, DateLike]] = None,
+    ) -> pd.DataFrame:
         """
         Retrieves filtered data.
 
+        The result shares its memory with the cached fact table thanks to
+        Copy-on-Write, so it costs no copy unless the caller modifies it.
+
         Args:
             columns (List[str]): List of columns to filter the DataFrame.
+            date_range (Optional[Tuple[DateLike, DateLike]]): Only returns
+                rows ordered between these two days (inclusive).
 
         Returns:
             pd.DataFrame: DataFrame containing data for metric xyz1.
         """
 
-        return self.df[columns].copy()
+        if self.df is None:
+            return self._query_source(columns, date_range)
+
+        if any(column not in self.df.columns for column in columns):
+            self._load_columns(columns)
+
+        df = self.df
+        if date_range is not None:
+            df = df.iloc[self._date_slice(*date_range)]
+
+        return df[columns]
+
+    @timed("loader.load_columns")
+    def _load_columns(self, columns: List[str]):
+        """
+        Adds the requested columns the fact table lacks to the shared
+        Dataset, so they are read from the source only once.
+
+        Args:
+            columns (List[str]): Stored or derived columns.
+        """
+
+        dataset = self.cache.extend(
+            self.source.name,
+            self.source.resolve,
+            self._load_dataset,
+            lambda dataset, path: self._add_columns(dataset, path, columns),
+        )
+        self.df = dataset.df
+        self.cube = dataset.cube
+        self.order_days = dataset.order_days
+        self.version = dataset.version
+
+    def _add_columns(
+        self, dataset: Dataset, path: str, columns: List[str]
+    ) -> Dataset:
+        """
+        Reads stored columns missing from a Dataset's fact table.
+
+        The columns are read together with the order date and prepared like
+        the fact table, so the same rows are dropped and the same stable sort
+        puts them into the fact table's row order.
+
+        Args:
+            dataset (Dataset): The cached Dataset.
+            path (str): The local path of the dataset file.
+            columns (List[str]): Stored or derived columns to add.
+
+        Returns:
+            Dataset: The Dataset with the added columns.
+        """
+
+        missing = [
+            column
+            for column in stored_columns(columns)
+            if column not in dataset.df.columns
+        ]
+        if not missing:
+            return dataset
+
+        extra = self._read_source(path, missing + ["Order Date"])
+        if len(extra) != len(dataset.df):
+            raise RuntimeError(
+                f"Columns read from {path} do not line up with the cached rows"
+            )
+
+        df = dataset.df.assign(
+            **{
+                column: extra[column]
+                for column in extra.columns
+                if column not in dataset.df.columns
+            }
+        )
+        if self.snapshot_dir is not None:
+            self._write_snapshot(
+                df, self._snapshot_path(), self._snapshot_signature(path)
+            )
+
+        return replace(dataset, df=df)
+
+    @timed("loader.query_source")
+    def _query_source(
+        self,
+        columns: List[str],
+        date_range: Optional[Tuple[DateLike, DateLike]],
+    ) -> pd.DataFrame:
+        """
+        Pushes a projection and date filter down to the source and prepares
+        only the rows and columns it returns. Sources without pushdown are
+        scanned chunk by chunk instead, keeping the matching rows only.
+
+        Args:
+            columns (List[str]): Stored or derived columns to return.
+            date_range (Optional[Tuple[DateLike, DateLike]]): Only returns
+                rows ordered between these two days (inclusive).
+
+        Returns:
+            pd.DataFrame: The prepared rows with the requested columns.
+        """
+
+        stored = stored_columns(columns)
+        path = self.source.resolve()
+
+        if self.source.supports_pushdown:
+            df = self.source.query(path, stored, date_range)
+            return self._prepare(df)[columns]
+
+        stored = stored_columns(stored + ["Order Date"])
+        if date_range is not None:
+            start = pd.Timestamp(date_range[0]).normalize()
+            stop = pd.Timestamp(date_range[1]).normalize() + pd.Timedelta(
+                days=1
+            )
+
+        frames = []
+        for chunk in self._read_chunks(path, stored):
+            if date_range is not None:
+                order_date = chunk["Order Date"]
+                chunk = chunk[(order_date >= start) & (order_date < stop)]
+            frames.append(chunk)
+
+        df = sort_categories(concat_frames(frames))
+        return df.sort_values("Order Date", kind="stable", ignore_index=True)[
+            columns
+        ]
@@ -0,0 +1,343 @@
+import bisect
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for the metrics server to listen
+STARTUP_TIMEOUT = 10
+
+# Upper bounds in seconds, from cached reruns to cold loads of large files
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    """
+    A metric family with a fixed set of label names.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labels):
+            raise ValueError(
+                f"{self.name} expects the labels {self.labels}, "
+                f"got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """
+        Returns (name suffix, formatted labels, value) of every sample.
+        """
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {_escape(self.help)}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class Counter(_Metric):
+    """
+    A monotonically increasing count, e.g. of cache hits.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            ("_total", _format_labels(self.labels, key), value)
+            for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    """
+    Counts observations, e.g. durations, into cumulative buckets.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: the count of each bucket (plus +Inf) and the sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(
+                key, ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            counts[index] += 1
+            total[0] += value
+
+    def time(self, **labels: str) -> "_Timer":
+        """
+        Returns a context manager observing the duration of its block.
+        """
+        return _Timer(self, labels)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            values = sorted(
+                (key, (list(counts), total[0]))
+                for key, (counts, total) in self._values.items()
+            )
+
+        samples = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append(
+                    (
+                        "_bucket",
+                        _format_labels(
+                            self.labels + ("le",),
+                            key + (_format_value(bound),),
+                        ),
+                        cumulative,
+                    )
+                )
+            labels = _format_labels(self.labels, key)
+            samples.append(("_sum", labels, total))
+            samples.append(("_count", labels, cumulative))
+        return samples
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(
+            time.perf_counter() - self._start, **self.labels
+        )
+        return False
+
+
+class Gauge(_Metric):
+    """
+    A value read when the metrics are scraped, e.g. the size of a cache.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, function: Callable[[], float]):
+        super().__init__(name, help)
+        self.function = function
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        return [("", "", self.function())]
+
+
+class Registry:
+    """
+    The metrics of the process, rendered in the Prometheus text format and
+    served by `app` on a port of its own, so every replica can be scraped.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "".join(metric.render() for metric in metrics)
+
+
+registry = Registry()
+
+DATASET_LOAD_SECONDS = registry.register(
+    Histogram(
+        "dashboard_dataset_load_seconds",
+        "Time spent loading datasets, by kind (full, append or columns).",
+        ["kind"],
+    )
+)
+DATASET_CACHE_REQUESTS = registry.register(
+    Counter(
+        "dashboard_dataset_cache_requests",
+        "Lookups of the dataset and aggregate cache, by result (hit, "
+        "revalidated, append or miss).",
+        ["result"],
+    )
+)
+FIGURE_CACHE_REQUESTS = registry.register(
+    Counter(
+        "dashboard_figure_cache_requests",
+        "Lookups of the figure cache, by figure and result (hit or miss).",
+        ["figure", "result"],
+    )
+)
+PAGE_RENDER_SECONDS = registry.register(
+    Histogram(
+        "dashboard_page_render_seconds",
+        "Time of the script runs of each page that ran to its end.",
+        ["page"],
+    )
+)
+
+
+def register_gauge(
+    name: str, help: str, function: Callable[[], float]
+) -> Gauge:
+    """
+    Exposes a value computed at scrape time, e.g. a cache size.
+    """
+    return registry.register(Gauge(name, help, function))
+
+
+async def app(scope, receive, send):
+    """
+    ASGI app serving the metrics at /metrics.
+    """
+
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    if scope["type"] != "http":
+        return
+
+    if scope["path"] == "/metrics":
+        status, body = 200, registry.render().encode()
+        content_type = b"text/plain; version=0.0.4; charset=utf-8"
+    else:
+        status, body = 404, b"Not Found\n"
+        content_type = b"text/plain; charset=utf-8"
+
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", content_type),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+def serve(
+    host: str, port: int, timeout: float = STARTUP_TIMEOUT
+) -> Optional[threading.Thread]:
+    """
+    Serves the metrics with uvicorn from a background thread, and waits for
+    it to listen.
+
+    Args:
+        host (str): The interface to listen on.
+        port (int): The port to listen on.
+        timeout (float): Seconds to wait for the server to start.
+
+    Returns:
+        Optional[threading.Thread]: The daemon thread running the server, or
+        None if it could not start, e.g. because the port is in use.
+    """
+
+    import uvicorn
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host=host, port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, name="metrics", daemon=True)
+    thread.start()
+
+    # uvicorn ends its thread if it cannot bind, which would go unnoticed
+    deadline = time.monotonic() + timeout
+    while (
+        not server.started
+        and thread.is_alive()
+        and time.monotonic() < deadline
+    ):
+        time.sleep(0.05)
+    if not server.started:
+        logger.error("Could not serve the metrics on %s:%d", host, port)
+        return None
+    return thread
@@ -0,0 +1,398 @@
+import json
+import os
+from dataclasses import astuple, dataclass
+from typing import Iterator, Optional
+from urllib.request import Request, urlopen
+
+from config import (
+    NARRATIVE_API_KEY_ENV,
+    NARRATIVE_BACKEND,
+    NARRATIVE_CACHE_SIZE,
+    NARRATIVE_MODEL,
+    NARRATIVE_URL,
+)
+from utils.lru import LRUCache
+
+
+@dataclass(frozen=True)
+class Kpis:
+    """
+    The yearly KPIs of the Overview page and those of the year before. The
+    prior values are None if the year before has no orders.
+    """
+
+    year: int
+    sales: float
+    profit: float
+    average_deal_size: float
+    prior_sales: Optional[float] = None
+    prior_profit: Optional[float] = None
+    prior_average_deal_size: Optional[float] = None
+
+    @property
+    def has_prior(self) -> bool:
+        return self.prior_sales is not None
+
+    @property
+    def sales_delta(self) -> float:
+        return self.sales - self.prior_sales
+
+    @property
+    def profit_delta(self) -> float:
+        return self.profit - self.prior_profit
+
+    @property
+    def average_deal_size_delta(self) -> float:
+        return self.average_deal_size - self.prior_average_deal_size
+
+
+def _money(value: float) -> str:
+    """
+    Formats an amount the German way, e.g. 733.947,02 \\$ (escaped for
+    Markdown).
+    """
+
+    formatted = f"{value:,.2f}"
+    formatted = formatted.replace(",", " ").replace(".", ",").replace(" ", ".")
+    return f"{formatted} \\$"
+
+
+def _is_slight(delta: float, prior: float) -> bool:
+    """
+    Whether a change is below 10% of the prior value.
+    """
+    return prior != 0 and abs(delta / prior) < 0.1
+
+
+def render_narrative(kpis: Kpis) -> str:
+    """
+    Writes the German description of the KPIs in Markdown.
+
+    Args:
+        kpis (Kpis): The KPIs to describe.
+
+    Returns:
+        str: Three paragraphs on sales and profit, the average deal size and
+        an overall assessment.
+    """
+
+    if not kpis.has_prior:
+        return _compose(
+            kpis,
+            sales=(
+                f"Im Jahr {kpis.year} wurde ein Gesamtumsatz von "
+                f"**{_money(kpis.sales)}** erzielt.  \n"
+            ),
+            profit=f"Der Gewinn lag bei **{_money(kpis.profit)}**.  \n",
+            development=(
+                "Für das Vorjahr liegen keine Aufträge vor, mit denen die "
+                "Entwicklung verglichen werden könnte."
+            ),
+            deal_size="Ein Vergleich mit dem Vorjahr ist nicht möglich.",
+            assessment=(
+                "Eine Bewertung der Entwicklung ist erst mit den Zahlen "
+                "eines weiteren Jahres möglich."
+            ),
+        )
+
+    sales_up = kpis.sales_delta >= 0
+    profit_up = kpis.profit_delta >= 0
+    deal_size_up = kpis.average_deal_size_delta >= 0
+
+    # Lines end in two spaces, which Markdown renders as line breaks
+    sales = (
+        f"Im Jahr {kpis.year} wurde ein Gesamtumsatz von "
+        f"**{_money(kpis.sales)}** erzielt – ein "
+        f"{'Plus' if sales_up else 'Minus'} von "
+        f"**{_money(abs(kpis.sales_delta))}** im Vergleich zum Vorjahr.  \n"
+    )
+    if profit_up:
+        profit = (
+            f"{'Auch der' if sales_up else 'Der'} Gewinn konnte gesteigert "
+            f"werden und lag bei **{_money(kpis.profit)}**, was einer "
+            f"Verbesserung um **{_money(abs(kpis.profit_delta))}** "
+            "entspricht.  \n"
+        )
+    else:
+        profit = (
+            f"Der Gewinn ging {'dagegen ' if sales_up else ''}auf "
+            f"**{_money(kpis.profit)}** zurück, was einer Verschlechterung "
+            f"um **{_money(abs(kpis.profit_delta))}** entspricht.  \n"
+        )
+    if sales_up and profit_up:
+        development = (
+            "Diese positive Entwicklung spiegelt die solide Performance des "
+            "Unternehmens wider."
+        )
+    elif sales_up or profit_up:
+        development = (
+            "Die Entwicklung ist gemischt und sollte genauer analysiert "
+            "werden."
+        )
+    else:
+        development = (
+            "Diese rückläufige Entwicklung erfordert gezielte Maßnahmen."
+        )
+
+    slight = (
+        "leichten "
+        if _is_slight(
+            kpis.average_deal_size_delta, kpis.prior_average_deal_size
+        )
+        else ""
+    )
+    if deal_size_up:
+        deal_size = (
+            f"Im Vergleich zum Vorjahr bedeutet dies einen {slight}Anstieg "
+            f"von **{_money(abs(kpis.average_deal_size_delta))}**.  \n"
+            "Dies deutet auf größere Einzelbestellungen oder höherwertige "
+            "Produkte hin."
+        )
+    else:
+        deal_size = (
+            f"Im Vergleich zum Vorjahr bedeutet dies jedoch einen "
+            f"{slight}Rückgang von "
+            f"**{_money(abs(kpis.average_deal_size_delta))}**.  \n"
+            "Dies könnte auf kleinere Einzelbestellungen oder veränderte "
+            "Kaufgewohnheiten hinweisen."
+        )
+
+    if sales_up and profit_up and not deal_size_up:
+        assessment = (
+            "Trotz des Rückgangs beim durchschnittlichen Auftragswert zeigen "
+            "die Umsatzzahlen und der gestiegene Gewinn eine robuste "
+            "Geschäftsentwicklung.  \n"
+            "Die Zahlen legen nahe, dass eine höhere Verkaufsmenge oder "
+            "effizientere Prozesse zum Erfolg beigetragen haben."
+        )
+    elif sales_up and profit_up:
+        assessment = (
+            "Steigende Umsätze, Gewinne und Auftragswerte zeigen eine "
+            "durchweg robuste Geschäftsentwicklung."
+        )
+    elif profit_up:
+        assessment = (
+            "Trotz des geringeren Umsatzes konnte der Gewinn gesteigert "
+            "werden, was auf eine verbesserte Profitabilität hindeutet."
+        )
+    elif sales_up:
+        assessment = (
+            "Der Umsatz wächst, doch der Gewinn hält nicht Schritt; Kosten "
+            "und Rabatte sollten überprüft werden."
+        )
+    else:
+        assessment = (
+            "Umsatz und Gewinn sind rückläufig; die Ursachen sollten "
+            "zeitnah analysiert werden."
+        )
+
+    return _compose(
+        kpis,
+        sales=sales,
+        profit=profit,
+        development=development,
+        deal_size=deal_size,
+        assessment=assessment,
+    )
+
+
+def _compose(
+    kpis: Kpis,
+    sales: str,
+    profit: str,
+    development: str,
+    deal_size: str,
+    assessment: str,
+) -> str:
+    """
+    Puts the sentences of the description under their headings.
+    """
+
+    return (
+        "📈 1. Umsatz- und Gewinnentwicklung  \n"
+        f"{sales}{profit}{development}\n\n"
+        "💰 2. Durchschnittlicher Auftragswert  \n"
+        f"Der durchschnittliche Auftragswert betrug im Jahr {kpis.year} "
+        f"**{_money(kpis.average_deal_size)}**.  \n"
+        f"{deal_size}\n\n"
+        "📊 3. Wirtschaftliche Gesamtbewertung  \n"
+        f"{assessment}\n"
+    )
+
+
+class NarrativeBackend:
+    """
+    Base class for the generators writing the KPI description.
+    """
+
+    @property
+    def name(self) -> str:
+        """
+        A unique name for the backend and its settings, used as cache key.
+        """
+
+        raise NotImplementedError
+
+    def stream(self, kpis: Kpis) -> Iterator[str]:
+        """
+        Yields the Markdown description of the KPIs in chunks, as they are
+        generated.
+        """
+
+        raise NotImplementedError
+
+
+class TemplateBackend(NarrativeBackend):
+    """
+    Writes the description from a fixed template, line by line. Works
+    offline and is the default.
+    """
+
+    @property
+    def name(self) -> str:
+        return "template"
+
+    def stream(self, kpis: Kpis) -> Iterator[str]:
+        yield from render_narrative(kpis).splitlines(keepends=True)
+
+
+class ChatCompletionsBackend(NarrativeBackend):
+    """
+    Has a language model behind an OpenAI compatible chat completions API
+    rephrase the templated description. All figures come from the template,
+    so the model never computes numbers itself.
+    """
+
+    def __init__(self, url: str, model: str, api_key: Optional[str] = None):
+        """
+        Args:
+            url (str): The chat completions endpoint.
+            model (str): The model to use.
+            api_key (Optional[str]): Sent as bearer token, if given.
+        """
+
+        self.url = url
+        self.model = model
+        self.api_key = api_key
+
+    @property
+    def name(self) -> str:
+        return f"chat:{self.url}:{self.model}"
+
+    def stream(self, kpis: Kpis) -> Iterator[str]:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        body = {
+            "model": self.model,
+            "stream": True,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": (
+                        "Du bist Analyst eines Einzelhändlers. Formuliere "
+                        "die folgende Auswertung für das Management neu. "
+                        "Behalte "
+                        "die Gliederung, das Markdown und alle Zahlen exakt "
+                        "bei und erfinde keine neuen Zahlen."
+                    ),
+                },
+                {"role": "user", "content": render_narrative(kpis)},
+            ],
+        }
+        request = Request(
+            self.url, data=json.dumps(body).encode(), headers=headers
+        )
+
+        # The response is a stream of server-sent events, one JSON chunk
+        # per "data:" line
+        with urlopen(request, timeout=60) as response:
+            for line in response:
+                line = line.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:") :].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or [{}]
+                content = choices[0].get("delta", {}).get("content")
+                if content:
+                    yield content
+
+
+def create_backend(kind: str = NARRATIVE_BACKEND) -> NarrativeBackend:
+    """
+    Creates the narrative backend configured in config.yaml.
+
+    Args:
+        kind (str): One of "template" or "chat".
+
+    Returns:
+        NarrativeBackend: The configured backend.
+    """
+
+    if kind == "template":
+        return TemplateBackend()
+    if kind == "chat":
+        return ChatCompletionsBackend(
+            NARRATIVE_URL,
+            NARRATIVE_MODEL,
+            os.environ.get(NARRATIVE_API_KEY_ENV),
+        )
+
+    raise ValueError(f"Unknown narrative backend: {kind}")
+
+
+class NarrativeCache:
+    """
+    A process-wide LRU cache of complete narratives, keyed by backend and
+    KPI values, so repeat visits render instantly.
+    """
+
+    def __init__(self, max_entries: int = NARRATIVE_CACHE_SIZE):
+        """
+        Args:
+            max_entries (int): Number of narratives kept.
+        """
+
+        self.max_entries = max_entries
+        self._entries = LRUCache(max_entries)
+
+    def stream(self, backend: NarrativeBackend, kpis: Kpis) -> Iterator[str]:
+        """
+        Yields the cached narrative as a single chunk, or streams a new one
+        from the backend and caches it once it was generated completely.
+
+        Args:
+            backend (NarrativeBackend): Generates missing narratives.
+            kpis (Kpis): The KPIs to describe.
+
+        Yields:
+            str: Chunks of the Markdown narrative.
+        """
+
+        # Rounded to cents, like the figures in the text
+        key = (
+            backend.name,
+            tuple(
+                None if value is None else round(value, 2)
+                for value in astuple(kpis)
+            ),
+        )
+
+        # Read before yielding, the consumer may hold on to the generator
+        narrative = self._entries.get(key)
+        if narrative is not None:
+            yield narrative
+            return
+
+        chunks = []
+        for chunk in backend.stream(kpis):
+            chunks.append(chunk)
+            yield chunk
+
+        # Only reached if the stream was not abandoned, e.g. by a rerun
+        self._entries.put(key, "".join(chunks))
+
+
+narrative_cache = NarrativeCache()
@@ -0,0 +1,136 @@
+import datetime
+from typing import Dict, List, Tuple
+
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+from config import COLUMNS_LINECHART
+from loader import DataLoader
+from utils.frames import isin_codes
+from utils.lru import LRUCache
+from utils.perf import timed
+
+# Pandas frequencies of the precomputed rollups
+ROLLUP_FREQUENCIES = ("D", "W", "ME")
+# Number of data versions whose rollups are kept
+CACHE_SIZE = 2
+
+
+def _rollup(df: pd.DataFrame, freq: str) -> pd.DataFrame:
+    """
+    Sums the sales per period and category, labelling each period by its
+    last day like pd.Grouper does.
+    """
+
+    return (
+        df.groupby(
+            [pd.Grouper(key="Order Date", freq=freq), "Category"],
+            observed=True,
+        )["Sales"]
+        .sum()
+        .reset_index()
+    )
+
+
+class SalesRollups:
+    """
+    The daily, weekly and monthly sales per category, computed once per
+    data version, so changing the granularity or the dates of the sales
+    chart is a lookup rather than a regrouping of the rows.
+    """
+
+    def __init__(self, max_entries: int = CACHE_SIZE):
+        """
+        Args:
+            max_entries (int): Number of data versions kept.
+        """
+
+        self.max_entries = max_entries
+        self._entries = LRUCache(max_entries)
+
+    def get(self, loader: DataLoader) -> Dict[str, pd.DataFrame]:
+        """
+        Returns the rollups of the loaded data by frequency, each with the
+        columns "Order Date", "Category" and "Sales", sorted by date.
+        """
+
+        rollups = self._entries.get(loader.version)
+        if rollups is None:
+            rollups = self._entries.put(loader.version, self._compute(loader))
+        return rollups
+
+    def clear(self):
+        """
+        Drops the rollups of all data versions.
+        """
+
+        self._entries.clear()
+
+    @staticmethod
+    @timed("rollups.compute")
+    def _compute(loader: DataLoader) -> Dict[str, pd.DataFrame]:
+        daily = _rollup(loader.get_data_for_metric(COLUMNS_LINECHART), "D")
+        # Coarser periods are summed from the days, not from the rows
+        return {
+            freq: daily if freq == "D" else _rollup(daily, freq)
+            for freq in ROLLUP_FREQUENCIES
+        }
+
+    @timed("rollups.query")
+    def query(
+        self,
+        loader: DataLoader,
+        date_range: Tuple[datetime.date, datetime.date],
+        freq: str,
+        categories: List[str],
+    ) -> pd.DataFrame:
+        """
+        Returns the sales per period and category between two days (both
+        inclusive), as if the rows of these days were grouped by period.
+
+        Periods that lie within the range entirely are read from their
+        rollup; the partly covered periods at its ends are summed from the
+        daily rollup.
+
+        Args:
+            loader (DataLoader): The loaded dataset.
+            date_range (Tuple[datetime.date, datetime.date]): The first and
+                last day.
+            freq (str): One of ROLLUP_FREQUENCIES.
+            categories (List[str]): The categories to return, all if empty.
+
+        Returns:
+            pd.DataFrame: "Order Date" (the last day of each period),
+            "Category" and "Sales", sorted by date.
+        """
+
+        rollups = self.get(loader)
+        start, end = (pd.Timestamp(day) for day in date_range)
+        daily = rollups["D"]
+        days = daily["Order Date"]
+
+        if freq == "D":
+            result = daily[(days >= start) & (days <= end)]
+        else:
+            # Labels of the periods holding the first and the last day
+            offset = to_offset(freq)
+            first, last = offset.rollforward(start), offset.rollforward(end)
+
+            periods = rollups[freq]
+            labels = periods["Order Date"]
+            inner = periods[(labels > first) & (labels < last)]
+            edge_days = daily[
+                (days >= start)
+                & (days <= end)
+                & ((days <= first) | (days > last - offset))
+            ]
+            result = pd.concat(
+                [inner, _rollup(edge_days, freq)], ignore_index=True
+            )
+
+        if categories:
+            result = result[isin_codes(result["Category"], categories)]
+        return result.sort_values("Order Date", kind="stable")
+
+
+sales_rollups = SalesRollups()
@@ -0,0 +1,265 @@
+import asyncio
+import logging
+import os
+import signal
+import subprocess
+import sys
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import (
+    ROOT,
+    SERVING_WORKER_PORT,
+    WARMUP_ENABLED,
+    WARMUP_READY_FILE,
+)
+
+logger = logging.getLogger(__name__)
+
+# Bytes copied per read between a client and its worker
+BUFFER_SIZE = 64 * 1024
+# Seconds between checks of the workers
+POLL_INTERVAL = 0.5
+# Seconds workers get to shut down before they are killed
+SHUTDOWN_TIMEOUT = 10
+
+# Options the launcher sets for every worker itself
+_WORKER_FLAGS = ("server_port", "server_address", "server_headless")
+
+
+def worker_ready_file(index: int) -> Optional[str]:
+    """
+    Returns the file a worker creates once its warm-up finished, or None if
+    no ready file is configured.
+    """
+
+    if not WARMUP_READY_FILE:
+        return None
+    return f"{WARMUP_READY_FILE}.{index}"
+
+
+def _flags(flag_options: Dict[str, Any]) -> List[str]:
+    """
+    Turns the Streamlit options main.py was started with back into flags,
+    leaving out those the launcher sets per worker.
+    """
+
+    flags = []
+    for name, value in flag_options.items():
+        if value is None or value == () or name in _WORKER_FLAGS:
+            continue
+        flag = "--" + name.replace("_", ".")
+        for item in value if isinstance(value, (list, tuple)) else [value]:
+            if isinstance(item, bool):
+                item = str(item).lower()
+            flags += [flag, str(item)]
+    return flags
+
+
+def worker_command(index: int, flag_options: Dict[str, Any]) -> List[str]:
+    """
+    Returns the command line running one worker.
+
+    Args:
+        index (int): The worker's index, from 0.
+        flag_options (Dict[str, Any]): The Streamlit options of the launcher.
+
+    Returns:
+        List[str]: The arguments of the worker process.
+    """
+
+    return [
+        sys.executable,
+        os.path.join(ROOT, "main.py"),
+        "--worker-index",
+        str(index),
+        *_flags(flag_options),
+        "--server.port",
+        str(SERVING_WORKER_PORT + index),
+        "--server.address",
+        "127.0.0.1",
+        "--server.headless",
+        "true",
+    ]
+
+
+def prepare_dataset():
+    """
+    Loads the dataset once before the workers start, so its snapshot is
+    written by a single process and every worker memory-maps the same file.
+
+    Failures are logged; the workers report them again on their pages.
+    """
+
+    from loader import DataLoader, DatasetCache
+
+    try:
+        # A private cache, so the rows are released once the snapshot exists
+        DataLoader(cache=DatasetCache())
+    except Exception:
+        logger.exception("Could not prepare the dataset for the workers")
+
+
+class Balancer:
+    """
+    A TCP load balancer passing each connection on to a worker, chosen by
+    the client's IP address so its page requests and websocket all reach
+    the process holding its session. Workers that refuse connections, e.g.
+    while starting, are skipped.
+    """
+
+    def __init__(self, backends: List[Tuple[str, int]]):
+        """
+        Args:
+            backends (List[Tuple[str, int]]): Host and port of every worker.
+        """
+
+        self.backends = backends
+
+    def candidates(self, client: str) -> List[Tuple[str, int]]:
+        """
+        Returns the workers in the order they are tried for a client.
+        """
+
+        start = zlib.crc32(client.encode()) % len(self.backends)
+        return self.backends[start:] + self.backends[:start]
+
+    @staticmethod
+    async def _pipe(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        try:
+            while data := await reader.read(BUFFER_SIZE):
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        peer = writer.get_extra_info("peername")
+        client = peer[0] if peer else ""
+
+        for host, port in self.candidates(client):
+            try:
+                backend_reader, backend_writer = await asyncio.open_connection(
+                    host, port
+                )
+                break
+            except OSError:
+                continue
+        else:
+            logger.warning("No worker accepted a connection from %s", client)
+            writer.close()
+            return
+
+        await asyncio.gather(
+            self._pipe(reader, backend_writer),
+            self._pipe(backend_reader, writer),
+        )
+
+    async def start(self, host: Optional[str], port: int) -> asyncio.Server:
+        """
+        Starts accepting connections.
+
+        Args:
+            host (Optional[str]): The interface to listen on, None for all.
+            port (int): The port to listen on.
+
+        Returns:
+            asyncio.Server: The listening server.
+        """
+
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def _supervise(
+    balancer: Balancer,
+    host: Optional[str],
+    port: int,
+    processes: List[subprocess.Popen],
+) -> int:
+    """
+    Balances connections until a worker exits or the launcher is stopped,
+    and creates the ready file once every worker finished its warm-up.
+    """
+
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopped.set)
+
+    ready_files = [worker_ready_file(i) for i in range(len(processes))]
+    ready = not (WARMUP_ENABLED and WARMUP_READY_FILE)
+
+    server = await balancer.start(host, port)
+    async with server:
+        while not stopped.is_set():
+            for index, process in enumerate(processes):
+                if process.poll() is not None:
+                    logger.error(
+                        "Worker %s exited with status %s",
+                        index,
+                        process.returncode,
+                    )
+                    return process.returncode or 1
+
+            if not ready and all(map(os.path.exists, ready_files)):
+                open(WARMUP_READY_FILE, "w").close()
+                ready = True
+
+            try:
+                await asyncio.wait_for(stopped.wait(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+    return 0
+
+
+def serve(
+    workers: int, flag_options: Dict[str, Any], host: Optional[str], port: int
+) -> int:
+    """
+    Serves the dashboard from several worker processes behind a load
+    balancer, until a worker exits or the launcher receives SIGINT/SIGTERM.
+
+    Args:
+        workers (int): The number of Streamlit processes.
+        flag_options (Dict[str, Any]): The Streamlit options of the launcher,
+            passed on to the workers.
+        host (Optional[str]): The interface to listen on, None for all.
+        port (int): The port clients connect to.
+
+    Returns:
+        int: The exit status, non-zero if a worker failed.
+    """
+
+    for path in [WARMUP_READY_FILE] + [
+        worker_ready_file(i) for i in range(workers)
+    ]:
+        if path and os.path.exists(path):
+            os.remove(path)
+    if WARMUP_READY_FILE:
+        os.makedirs(os.path.dirname(WARMUP_READY_FILE) or ".", exist_ok=True)
+
+    prepare_dataset()
+
+    processes = [
+        subprocess.Popen(worker_command(i, flag_options))
+        for i in range(workers)
+    ]
+    balancer = Balancer(
+        [("127.0.0.1", SERVING_WORKER_PORT + i) for i in range(workers)]
+    )
+    try:
+        return asyncio.run(_supervise(balancer, host, port, processes))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(SHUTDOWN_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                process.kill()
@@ -0,0 +1,498 @@
+import datetime
+import io
+import os
+import sqlite3
+from typing import Collection, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from config import (
+    CATEGORICAL_COLUMNS,
+    COLUMN_DTYPES,
+    DATA_SOURCE,
+    DATASET_FILE,
+    DATASET_NAME,
+    DATASET_PATH,
+    DATASET_TABLE,
+    DATE_COLUMNS,
+    DATE_FORMAT,
+    SYNTHETIC_DIR,
+    SYNTHETIC_ROWS,
+    SYNTHETIC_SEED,
+)
+
+
+class DataSource:
+    """
+    Base class for the places the raw Superstore rows are read from.
+
+    Every source is backed by a local file, whose modification time and size
+    decide when the cached dataset is reloaded.
+    """
+
+    # strftime format of the date columns as stored by the source
+    date_format: str = DATE_FORMAT
+    # Rows appended to the file can be read without re-reading the rest
+    supports_append: bool = False
+    # Projections, filters and aggregations run inside the source instead of
+    # on an in-memory copy of the whole table
+    supports_pushdown: bool = False
+
+    @property
+    def name(self) -> str:
+        """
+        A unique name for the source, used as cache key and snapshot name.
+        """
+
+        raise NotImplementedError
+
+    def resolve(self) -> str:
+        """
+        Fetches the backing file (if necessary) and returns its local path.
+        """
+
+        raise NotImplementedError
+
+    def read(
+        self, path: str, columns: Optional[Collection[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Reads all rows of the backing file at `path`, keeping only the given
+        columns (all if None). Columns the file does not have are ignored.
+        """
+
+        raise NotImplementedError
+
+    def read_chunks(
+        self, path: str, columns: Collection[str], chunksize: int
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Reads the rows of the backing file in chunks, keeping only the given
+        columns. Columns the file does not have are ignored.
+
+        Sources that cannot stream return all rows as a single chunk.
+
+        Args:
+            path (str): The local path of the backing file.
+            columns (Collection[str]): The columns to keep.
+            chunksize (int): The maximum number of rows per chunk.
+
+        Returns:
+            Iterator[pd.DataFrame]: The chunks, in file order.
+        """
+
+        yield self.read(path, columns)
+
+
+class CsvSource(DataSource):
+    """
+    A CSV file on the local file system.
+    """
+
+    supports_append = True
+
+    def __init__(
+        self,
+        path: str,
+        encoding: str = "latin-1",
+        dtypes: Dict[str, str] = COLUMN_DTYPES,
+    ):
+        """
+        Args:
+            path (str): The path of the CSV file.
+            encoding (str): The text encoding of the file.
+            dtypes (Dict[str, str]): The dtypes columns are parsed with, in
+                addition to the categorical columns of config.yaml.
+        """
+
+        self.path = path
+        self.encoding = encoding
+        # The few distinct days are parsed once per category by the loader
+        self.dtypes = {
+            **dict.fromkeys(CATEGORICAL_COLUMNS + DATE_COLUMNS, "category"),
+            **dtypes,
+        }
+
+    @property
+    def name(self) -> str:
+        return f"csv:{os.path.abspath(self.path)}"
+
+    def resolve(self) -> str:
+        return self.path
+
+    def _read_csv(self, file, columns: Optional[Collection[str]], **kwargs):
+        """
+        Calls pd.read_csv with the encoding, dtypes and column projection of
+        the source.
+        """
+
+        return pd.read_csv(
+            file,
+            encoding=self.encoding,
+            # A callable skips unknown names instead of failing on them
+            usecols=None
+            if columns is None
+            else (lambda column: column in columns),
+            dtype=self.dtypes,
+            **kwargs,
+        )
+
+    def read(
+        self, path: str, columns: Optional[Collection[str]] = None
+    ) -> pd.DataFrame:
+        return self._read_csv(path, columns)
+
+    def read_chunks(
+        self, path: str, columns: Collection[str], chunksize: int
+    ) -> Iterator[pd.DataFrame]:
+        with self._read_csv(path, columns, chunksize=chunksize) as reader:
+            yield from reader
+
+    def read_appended(
+        self,
+        path: str,
+        offset: int,
+        end: int,
+        columns: Optional[Collection[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Reads the rows stored between two byte offsets of the file.
+
+        Args:
+            path (str): The local path of the CSV file.
+            offset (int): A byte offset at the start of a line.
+            end (int): A byte offset just after a line break.
+            columns (Optional[Collection[str]]): The columns to keep.
+
+        Returns:
+            pd.DataFrame: The rows in between, named after the header.
+        """
+
+        names = pd.read_csv(path, encoding=self.encoding, nrows=0).columns
+        with open(path, "rb") as file:
+            file.seek(offset)
+            appended = io.BytesIO(file.read(end - offset))
+        return self._read_csv(appended, columns, header=None, names=names)
+
+
+class KaggleSource(CsvSource):
+    """
+    A CSV file of a Kaggle dataset, downloaded into the kagglehub cache.
+    """
+
+    def __init__(self, dataset_name: str, dataset_file: str):
+        """
+        Args:
+            dataset_name (str): The name of the Kaggle dataset (e.g., 'username/dataset-name').
+            dataset_file (str): The name of the file within the dataset to load (e.g., 'data.csv').
+        """
+
+        super().__init__(dataset_file)
+        self.dataset_name = dataset_name
+        self.dataset_file = dataset_file
+
+    @property
+    def name(self) -> str:
+        return f"kaggle:{self.dataset_name}/{self.dataset_file}"
+
+    def resolve(self) -> str:
+        # Imported here, so other sources never pay for kagglehub's HTTP stack
+        import kagglehub
+
+        return kagglehub.dataset_download(
+            self.dataset_name, path=self.dataset_file
+        )
+
+
+class SyntheticSource(CsvSource):
+    """
+    A generated CSV file with Superstore-shaped rows, for testing the
+    dashboard at arbitrary volumes without access to the real dataset.
+    """
+
+    def __init__(self, rows: int, seed: int = 0, directory: str = "."):
+        """
+        Args:
+            rows (int): The number of rows to generate.
+            seed (int): Seed of the generator, equal seeds give equal rows.
+            directory (str): Where the generated file is stored.
+        """
+
+        # Imported here, so other sources never load the generator
+        import synthetic
+
+        super().__init__(synthetic.dataset_path(directory, rows, seed))
+        self.rows = rows
+        self.seed = seed
+
+    @property
+    def name(self) -> str:
+        return f"synthetic:{self.rows}:{self.seed}"
+
+    def resolve(self) -> str:
+        import synthetic
+
+        # Generated on first use only, the file is reused afterwards
+        return synthetic.write_csv(
+            self.path, self.rows, self.seed, date_format=self.date_format
+        )
+
+
+class ParquetSource(DataSource):
+    """
+    A Parquet file on the local file system.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): The path of the Parquet file.
+        """
+
+        self.path = path
+
+    @property
+    def name(self) -> str:
+        return f"parquet:{os.path.abspath(self.path)}"
+
+    def resolve(self) -> str:
+        return self.path
+
+    @staticmethod
+    def _columns(
+        names: List[str], columns: Optional[Collection[str]]
+    ) -> List[str]:
+        if columns is None:
+            return names
+        return [name for name in names if name in columns]
+
+    def read(
+        self, path: str, columns: Optional[Collection[str]] = None
+    ) -> pd.DataFrame:
+        # pyarrow.parquet takes longer to import than the rest of pyarrow
+        import pyarrow.parquet as pq
+
+        file = pq.ParquetFile(path)
+        return file.read(
+            columns=self._columns(file.schema_arrow.names, columns)
+        ).to_pandas()
+
+    def read_chunks(
+        self, path: str, columns: Collection[str], chunksize: int
+    ) -> Iterator[pd.DataFrame]:
+        import pyarrow.parquet as pq
+
+        file = pq.ParquetFile(path)
+        for batch in file.iter_batches(
+            batch_size=chunksize,
+            columns=self._columns(file.schema_arrow.names, columns),
+        ):
+            yield batch.to_pandas()
+
+
+class SqliteSource(DataSource):
+    """
+    A table in an SQLite database file. Dates must be stored as ISO
+    (YYYY-MM-DD) text so they compare and extract correctly in SQL.
+
+    Column projections and date filters of page queries, as well as the
+    aggregation of the cube, are pushed down to SQLite, so the table is
+    never held in memory as a whole.
+    """
+
+    date_format = "%Y-%m-%d"
+    supports_pushdown = True
+
+    # SQL expressions for the derived fact table columns that can be grouped
+    # or aggregated inside SQLite
+    DERIVED_SQL: Dict[str, str] = {
+        "year": "CAST(strftime('%Y', \"Order Date\") AS INTEGER)",
+        "month": "CAST(strftime('%m', \"Order Date\") AS INTEGER)",
+        "ship_year": "CAST(strftime('%Y', \"Ship Date\") AS INTEGER)",
+        "profit_margin": '"Profit" * 100.0 / "Sales"',
+    }
+
+    def __init__(self, path: str, table: str):
+        """
+        Args:
+            path (str): The path of the SQLite database file.
+            table (str): The table holding the Superstore rows.
+        """
+
+        self.path = path
+        self.table = table
+
+    @property
+    def name(self) -> str:
+        return f"sqlite:{os.path.abspath(self.path)}#{self.table}"
+
+    def resolve(self) -> str:
+        return self.path
+
+    def read(
+        self, path: str, columns: Optional[Collection[str]] = None
+    ) -> pd.DataFrame:
+        if columns is None:
+            return self.query(path, ["*"])
+
+        with self._connect(path) as connection:
+            names = [
+                row[1]
+                for row in connection.execute(
+                    f"PRAGMA table_info({self._quote(self.table)})"
+                )
+            ]
+        return self.query(path, [name for name in names if name in columns])
+
+    @staticmethod
+    def _quote(identifier: str) -> str:
+        return '"{}"'.format(identifier.replace('"', '""'))
+
+    def _expression(self, column: str) -> str:
+        if column in self.DERIVED_SQL:
+            return self.DERIVED_SQL[column]
+        return self._quote(column)
+
+    def _connect(self, path: str) -> sqlite3.Connection:
+        # Read-only connections are cheap and safe to open per query
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+    def query(
+        self,
+        path: str,
+        columns: List[str],
+        date_range: Optional[Tuple[datetime.date, datetime.date]] = None,
+    ) -> pd.DataFrame:
+        """
+        Selects columns, optionally restricted to an order date range, in
+        order date order.
+
+        Args:
+            path (str): The local path of the database file.
+            columns (List[str]): The stored columns to select, or ["*"].
+            date_range (Optional[Tuple[datetime.date, datetime.date]]): The
+                first and last order day (inclusive) to select.
+
+        Returns:
+            pd.DataFrame: The selected rows.
+        """
+
+        select = ", ".join(
+            "*" if column == "*" else self._quote(column) for column in columns
+        )
+        sql = f"SELECT {select} FROM {self._quote(self.table)}"
+        params: Tuple[str, ...] = ()
+
+        if date_range is not None:
+            sql += ' WHERE "Order Date" BETWEEN ? AND ?'
+            params = tuple(
+                pd.Timestamp(day).strftime(self.date_format)
+                for day in date_range
+            )
+
+        sql += ' ORDER BY "Order Date"'
+
+        with self._connect(path) as connection:
+            return pd.read_sql_query(sql, connection, params=params)
+
+    def aggregate(
+        self,
+        path: str,
+        dimensions: List[str],
+        measures: List[str],
+    ) -> pd.DataFrame:
+        """
+        Computes the cells of a DataCube with a single GROUP BY query.
+
+        Args:
+            path (str): The local path of the database file.
+            dimensions (List[str]): Columns the cube is grouped by.
+            measures (List[str]): Columns summed in each cell.
+
+        Returns:
+            pd.DataFrame: The cube cells, see DataCube.
+        """
+
+        select = [
+            f"{self._expression(column)} AS {self._quote(column)}"
+            for column in dimensions
+        ]
+        select += [
+            f"SUM({self._expression(column)}) AS {self._quote(column)}"
+            for column in measures
+        ]
+        select += [
+            f"COUNT({self._expression(column)}) AS "
+            f"{self._quote(column + '__n')}"
+            for column in measures
+        ]
+        select.append('COUNT(*) AS "count"')
+
+        group_by = ", ".join(str(i + 1) for i in range(len(dimensions)))
+        sql = (
+            f"SELECT {', '.join(select)} FROM {self._quote(self.table)} "
+            f'WHERE "Order Date" IS NOT NULL GROUP BY {group_by}'
+        )
+
+        with self._connect(path) as connection:
+            return pd.read_sql_query(sql, connection)
+
+    def date_bounds(
+        self, path: str, year: Optional[int] = None
+    ) -> Tuple[datetime.date, datetime.date]:
+        """
+        Returns the first and last order date, optionally within one year.
+
+        Raises:
+            ValueError: If there are no orders (in that year).
+        """
+
+        sql = (
+            'SELECT MIN("Order Date"), MAX("Order Date") '
+            f"FROM {self._quote(self.table)}"
+        )
+        params: Tuple[str, ...] = ()
+
+        if year is not None:
+            sql += ' WHERE "Order Date" >= ? AND "Order Date" < ?'
+            params = (f"{year:04d}-01-01", f"{year + 1:04d}-01-01")
+
+        with self._connect(path) as connection:
+            first, last = connection.execute(sql, params).fetchone()
+
+        # MIN and MAX are NULL without matching rows
+        if first is None:
+            raise ValueError(
+                "No orders" if year is None else f"No orders in {year}"
+            )
+
+        return (
+            datetime.datetime.strptime(first, self.date_format).date(),
+            datetime.datetime.strptime(last, self.date_format).date(),
+        )
+
+
+def create_source(kind: str = DATA_SOURCE) -> DataSource:
+    """
+    Creates the data source configured in config.yaml.
+
+    Args:
+        kind (str): One of "kaggle", "csv", "parquet", "sqlite" or
+            "synthetic".
+
+    Returns:
+        DataSource: The configured source.
+    """
+
+    if kind == "kaggle":
+        return KaggleSource(DATASET_NAME, DATASET_FILE)
+    if kind == "csv":
+        return CsvSource(DATASET_PATH)
+    if kind == "parquet":
+        return ParquetSource(DATASET_PATH)
+    if kind == "sqlite":
+        return SqliteSource(DATASET_PATH, DATASET_TABLE)
+    if kind == "synthetic":
+        return SyntheticSource(SYNTHETIC_ROWS, SYNTHETIC_SEED, SYNTHETIC_DIR)
+
+    raise ValueError(f"Unknown data source: {kind}")
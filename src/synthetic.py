@@ -0,0 +1,304 @@
+import argparse
+import os
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+# Sub-categories of each product category of the Superstore dataset
+CATEGORIES = {
+    "Furniture": ["Bookcases", "Chairs", "Furnishings", "Tables"],
+    "Office Supplies": [
+        "Appliances",
+        "Art",
+        "Binders",
+        "Envelopes",
+        "Fasteners",
+        "Labels",
+        "Paper",
+        "Storage",
+        "Supplies",
+    ],
+    "Technology": ["Accessories", "Copiers", "Machines", "Phones"],
+}
+
+# Ship modes with their share of the orders and the range of days shipping
+# takes (inclusive)
+SHIP_MODES = {
+    "Standard Class": (0.60, 4, 7),
+    "Second Class": (0.19, 2, 5),
+    "First Class": (0.16, 1, 4),
+    "Same Day": (0.05, 0, 0),
+}
+
+SEGMENTS = {"Consumer": 0.52, "Corporate": 0.30, "Home Office": 0.18}
+
+# States of the contiguous United States and the sales region they belong to
+STATES = {
+    "Alabama": "South",
+    "Arizona": "West",
+    "Arkansas": "South",
+    "California": "West",
+    "Colorado": "West",
+    "Connecticut": "East",
+    "Delaware": "East",
+    "District of Columbia": "East",
+    "Florida": "South",
+    "Georgia": "South",
+    "Idaho": "West",
+    "Illinois": "Central",
+    "Indiana": "Central",
+    "Iowa": "Central",
+    "Kansas": "Central",
+    "Kentucky": "South",
+    "Louisiana": "South",
+    "Maine": "East",
+    "Maryland": "East",
+    "Massachusetts": "East",
+    "Michigan": "Central",
+    "Minnesota": "Central",
+    "Mississippi": "South",
+    "Missouri": "Central",
+    "Montana": "West",
+    "Nebraska": "Central",
+    "Nevada": "West",
+    "New Hampshire": "East",
+    "New Jersey": "East",
+    "New Mexico": "West",
+    "New York": "East",
+    "North Carolina": "South",
+    "North Dakota": "Central",
+    "Ohio": "East",
+    "Oklahoma": "Central",
+    "Oregon": "West",
+    "Pennsylvania": "East",
+    "Rhode Island": "East",
+    "South Carolina": "South",
+    "South Dakota": "Central",
+    "Tennessee": "South",
+    "Texas": "Central",
+    "Utah": "West",
+    "Vermont": "East",
+    "Virginia": "South",
+    "Washington": "West",
+    "West Virginia": "East",
+    "Wisconsin": "Central",
+    "Wyoming": "West",
+}
+
+# Order dates are drawn from this range, like in the original dataset
+FIRST_ORDER_DATE = "2011-01-01"
+LAST_ORDER_DATE = "2014-12-31"
+
+# Columns of the Superstore CSV file, in file order
+COLUMNS = [
+    "Row ID",
+    "Order ID",
+    "Order Date",
+    "Ship Date",
+    "Ship Mode",
+    "Customer ID",
+    "Customer Name",
+    "Segment",
+    "Country",
+    "City",
+    "State",
+    "Postal Code",
+    "Region",
+    "Product ID",
+    "Category",
+    "Sub-Category",
+    "Product Name",
+    "Sales",
+    "Quantity",
+    "Discount",
+    "Profit",
+]
+
+
+def _choice(rng: np.random.Generator, shares: dict, size: int) -> np.ndarray:
+    """
+    Draws indices into the keys of `shares`, weighted by its values.
+    """
+
+    weights = np.fromiter(shares.values(), dtype=float)
+    return rng.choice(len(weights), size=size, p=weights / weights.sum())
+
+
+def _labels(prefix: str, numbers: np.ndarray, width: int) -> pa.Array:
+    """
+    Formats numbers as zero-padded identifiers, e.g. "CU-000042".
+    """
+
+    digits = pc.utf8_lpad(pc.cast(pa.array(numbers), pa.string()), width, "0")
+    return pc.binary_join_element_wise(prefix, digits, "")
+
+
+def generate_tables(
+    rows: int,
+    seed: int = 0,
+    chunk_size: int = 1_000_000,
+    date_format: str = "%d-%m-%Y",
+) -> Iterator[pa.Table]:
+    """
+    Generates Superstore-shaped rows with plausible value distributions.
+
+    The rows are produced in chunks, so datasets far larger than memory can
+    be written to disk. The same arguments always produce the same rows.
+
+    Args:
+        rows (int): The total number of rows.
+        seed (int): Seed of the random number generator.
+        chunk_size (int): The maximum number of rows per chunk.
+        date_format (str): strftime format of the date columns.
+
+    Returns:
+        Iterator[pa.Table]: The chunks, with the columns of COLUMNS.
+    """
+
+    rng = np.random.default_rng(seed)
+
+    # Formatting the few distinct days once is much cheaper than formatting
+    # millions of timestamps
+    days = pd.date_range(
+        FIRST_ORDER_DATE, pd.Timestamp(LAST_ORDER_DATE) + pd.Timedelta(days=7)
+    )
+    day_labels = pa.array(days.strftime(date_format).tolist())
+    order_days = len(days) - 7
+
+    ship_modes = pa.array(list(SHIP_MODES))
+    ship_shares = {mode: share for mode, (share, _, _) in SHIP_MODES.items()}
+    ship_delays = np.array([delays for _, *delays in SHIP_MODES.values()])
+    segments = pa.array(list(SEGMENTS))
+    states = pa.array(list(STATES))
+    regions = pa.array(list(STATES.values()))
+    postal_codes = rng.integers(10_000, 99_999, size=len(STATES))
+    categories = pa.array(
+        [category for category, members in CATEGORIES.items() for _ in members]
+    )
+    sub_categories = pa.array(
+        [member for members in CATEGORIES.values() for member in members]
+    )
+    customers = max(rows // 12, 1)
+    # Average price level and profit margin of each sub-category
+    price_levels = rng.uniform(20.0, 400.0, size=len(sub_categories))
+    margins = rng.uniform(0.05, 0.30, size=len(sub_categories))
+
+    for start in range(0, rows, chunk_size):
+        size = min(chunk_size, rows - start)
+        row_ids = np.arange(start + 1, start + size + 1)
+
+        order_day = rng.integers(0, order_days, size=size)
+        ship_mode = _choice(rng, ship_shares, size)
+        low, high = ship_delays[ship_mode, 0], ship_delays[ship_mode, 1]
+        ship_day = order_day + low + rng.integers(0, high - low + 1)
+
+        state = rng.integers(0, len(states), size=size)
+        product = rng.integers(0, len(sub_categories), size=size)
+        customer = rng.integers(0, customers, size=size)
+        segment = _choice(rng, SEGMENTS, size)
+
+        quantity = rng.integers(1, 10, size=size)
+        discount = rng.choice([0.0, 0.0, 0.0, 0.1, 0.2, 0.3], size=size)
+        unit_price = price_levels[product] * rng.lognormal(0, 0.6, size)
+        sales = np.round(unit_price * quantity * (1.0 - discount), 2)
+        margin = margins[product] - discount + rng.normal(0, 0.15, size)
+        profit = np.round(sales * margin, 4)
+
+        yield pa.table(
+            {
+                "Row ID": row_ids,
+                "Order ID": _labels("US-", row_ids // 2, 8),
+                "Order Date": day_labels.take(order_day),
+                "Ship Date": day_labels.take(ship_day),
+                "Ship Mode": ship_modes.take(ship_mode),
+                "Customer ID": _labels("CU-", customer, 6),
+                "Customer Name": _labels("Customer ", customer, 6),
+                "Segment": segments.take(segment),
+                "Country": pa.repeat("United States", size),
+                "City": pa.repeat("Springfield", size),
+                "State": states.take(state),
+                "Postal Code": postal_codes[state],
+                "Region": regions.take(state),
+                "Product ID": _labels("PR-", product, 4),
+                "Category": categories.take(product),
+                "Sub-Category": sub_categories.take(product),
+                "Product Name": pa.repeat("Product", size),
+                "Sales": sales,
+                "Quantity": quantity,
+                "Discount": discount,
+                "Profit": profit,
+            }
+        )
+
+
+def generate(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generates a synthetic Superstore dataset in memory, see generate_tables.
+    """
+
+    return pa.concat_tables(generate_tables(rows, seed)).to_pandas()
+
+
+def dataset_path(directory: str, rows: int, seed: int) -> str:
+    """
+    Returns the path a generated dataset is stored at within a directory.
+    """
+
+    return os.path.join(directory, f"superstore-{rows}-{seed}.csv")
+
+
+def write_csv(
+    path: str, rows: int, seed: int = 0, date_format: str = "%d-%m-%Y"
+) -> str:
+    """
+    Streams a synthetic Superstore CSV file to disk, unless it already
+    exists. Only one chunk is held in memory at a time.
+
+    Args:
+        path (str): The path of the CSV file.
+        rows (int): The number of rows to generate.
+        seed (int): Seed of the random number generator.
+        date_format (str): strftime format of the date columns.
+
+    Returns:
+        str: The path of the CSV file.
+    """
+
+    if rows < 1:
+        raise ValueError("A synthetic dataset needs at least one row")
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    tables = generate_tables(rows, seed, date_format=date_format)
+    first = next(tables)
+
+    # Arrow's CSV writer is an order of magnitude faster than DataFrame.to_csv
+    with pa_csv.CSVWriter(
+        tmp_path,
+        first.schema,
+        write_options=pa_csv.WriteOptions(quoting_style="needed"),
+    ) as writer:
+        writer.write_table(first)
+        for table in tables:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Writes a synthetic Superstore CSV file."
+    )
+    parser.add_argument("path", help="Where to write the CSV file.")
+    parser.add_argument("rows", type=int, help="The number of rows.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    args = parser.parse_args()
+
+    write_csv(args.path, args.rows, args.seed)
@@ -0,0 +1,128 @@
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Picks `n_out` points of a line with Largest-Triangle-Three-Buckets: the
+    first and last point, and from each of the equally sized buckets in
+    between the point spanning the largest triangle with the point picked
+    before it and the mean of the next bucket. Keeps peaks and the shape of
+    the line at a fraction of its points.
+
+    Args:
+        x (np.ndarray): Ascending x values, as numbers.
+        y (np.ndarray): The y values.
+        n_out (int): Number of points to keep, at least 3.
+
+    Returns:
+        np.ndarray: Ascending positions of the kept points.
+    """
+
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    # Bucket boundaries over the points between the first and the last one
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    picked = np.empty(n_out, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            following = slice(edges[i + 1], edges[i + 2])
+            mean_x, mean_y = x[following].mean(), y[following].mean()
+        else:
+            mean_x, mean_y = x[-1], y[-1]
+
+        # Twice the triangle areas, which rank the same
+        areas = np.abs(
+            (x[previous] - mean_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (mean_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        picked[i + 1] = previous
+
+    return picked
+
+
+def min_max(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Keeps the first and the last point and the smallest and the largest
+    value of equally sized buckets in between, in a single sort. Preserves
+    the extremes of every bucket, at the cost of more jitter than `lttb`.
+
+    Args:
+        y (np.ndarray): The y values.
+        n_out (int): Number of points to keep at most, at least 4.
+
+    Returns:
+        np.ndarray: Ascending positions of the kept points.
+    """
+
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+
+    count = (n_out - 2) // 2
+    buckets = np.arange(n) * count // n
+    # lexsort sorts by its last key first: by bucket, then by value
+    order = np.lexsort((y, buckets))
+    starts = np.searchsorted(buckets[order], np.arange(count))
+    ends = np.append(starts[1:], n) - 1
+    return np.unique(np.concatenate([[0, n - 1], order[starts], order[ends]]))
+
+
+def downsample(
+    df: pd.DataFrame,
+    x: str,
+    y: str,
+    by: str,
+    max_points: int,
+    method: str = "lttb",
+) -> pd.DataFrame:
+    """
+    Caps the number of points of every line, e.g. of a chart with one trace
+    per category. Lines with at most `max_points` points are kept as they
+    are.
+
+    Args:
+        df (pd.DataFrame): The points, sorted by `x` within every line.
+        x (str): The x column, numeric or datetime.
+        y (str): The y column.
+        by (str): The column telling the lines apart.
+        max_points (int): Number of points kept per line at most.
+        method (str): "lttb" or "minmax".
+
+    Returns:
+        pd.DataFrame: The kept rows, in their original order.
+    """
+
+    if method not in ("lttb", "minmax"):
+        raise ValueError(f"Unknown downsampling method: {method}")
+
+    keep: List[np.ndarray] = []
+    lines = df.groupby(by, observed=True, sort=False).indices
+    for rows in lines.values():
+        if len(rows) <= max_points:
+            keep.append(rows)
+            continue
+        values = df[y].to_numpy()[rows]
+        if method == "lttb":
+            xs = df[x].to_numpy()[rows]
+            if np.issubdtype(xs.dtype, np.datetime64):
+                xs = xs.astype(np.int64)
+            positions = lttb(xs, values, max_points)
+        else:
+            positions = min_max(values, max_points)
+        keep.append(rows[positions])
+
+    if not keep:
+        return df
+    return df.iloc[np.sort(np.concatenate(keep))]
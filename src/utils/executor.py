@@ -0,0 +1,233 @@
+import itertools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from config import COMPUTE_MAX_PENDING, COMPUTE_WORKERS
+from utils.perf import attach_rerun, rerun_state
+
+# Seconds between checks whether the waiting script run was superseded
+POLL_INTERVAL = 0.05
+# Seconds the generation of a session is remembered after its last rerun
+RUN_RETENTION_SECONDS = 3600
+# Session state key looked up to let Streamlit handle rerun requests
+_YIELD_KEY = "_compute_yield"
+
+# Script run generations, unique across all sessions
+_generations = itertools.count(1)
+
+
+class Superseded(Exception):
+    """
+    Raised for the tasks of a script run that a newer run of its session
+    replaced, e.g. after the user moved a slider again.
+    """
+
+
+def _yield_to_streamlit():
+    """
+    Lets Streamlit act on a rerun or stop request for the current script
+    run, by raising the exception that ends it. Streamlit checks for such
+    requests whenever the script sends an element or reads its session
+    state; a script waiting for tasks does neither, so it reads the session
+    state, which sends nothing to the browser.
+    """
+
+    return _YIELD_KEY in st.session_state
+
+
+class ComputeExecutor:
+    """
+    A thread pool shared by all sessions, running the independent
+    aggregations and figures of a page concurrently. At most `max_pending`
+    tasks are queued or running; further submissions wait for a slot.
+
+    Every script run is a new generation of its session. A script waiting
+    for its tasks is stopped as soon as Streamlit is asked to rerun it, and
+    tasks of older generations are dropped before they start, so rapid
+    filter changes do not queue up work nobody waits for.
+
+    Usage:
+        total, category = compute.run(
+            lambda: total_figure(...), lambda: category_figure(...)
+        )
+    """
+
+    def __init__(
+        self,
+        workers: int = COMPUTE_WORKERS,
+        max_pending: int = COMPUTE_MAX_PENDING,
+    ):
+        """
+        Args:
+            workers (int): Threads running tasks.
+            max_pending (int): Tasks queued or running at most.
+        """
+
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="compute"
+        )
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        # Per session, its current generation and when it started
+        self._runs: Dict[str, Tuple[int, float]] = {}
+        # Per session, the tasks not done yet
+        self._pending: Dict[Optional[str], Set[Future]] = {}
+
+    def begin_rerun(self):
+        """
+        Starts a new generation for the session of the current script run,
+        cancelling the tasks its earlier runs left queued. Called at the
+        start of every page.
+        """
+
+        ctx = get_script_run_ctx(suppress_warning=True)
+        if ctx is None:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            for session, (_, started) in list(self._runs.items()):
+                if started < now - RUN_RETENTION_SECONDS:
+                    del self._runs[session]
+            self._runs[ctx.session_id] = (next(_generations), now)
+            pending = self._pending.pop(ctx.session_id, set())
+
+        for future in pending:
+            future.cancel()
+
+    def _current_run(self) -> Tuple[Optional[str], Optional[int], Any]:
+        """
+        Returns the session, generation and context of the current script
+        run; all None outside of one.
+        """
+
+        ctx = get_script_run_ctx(suppress_warning=True)
+        if ctx is None:
+            return None, None, None
+        with self._lock:
+            generation, _ = self._runs.get(ctx.session_id, (None, 0.0))
+        return ctx.session_id, generation, ctx
+
+    def _superseded(
+        self, run: Tuple[Optional[str], Optional[int], Any]
+    ) -> bool:
+        session, generation, ctx = run
+        if ctx is None:
+            return False
+        with self._lock:
+            current, _ = self._runs.get(session, (generation, 0.0))
+        return current != generation
+
+    def submit(self, function: Callable, *args, **kwargs) -> Future:
+        """
+        Queues a task, waiting for a free slot if `max_pending` tasks are
+        queued or running.
+
+        Args:
+            function (Callable): The task, which must not call Streamlit.
+            *args: Positional arguments of the task.
+            **kwargs: Keyword arguments of the task.
+
+        Returns:
+            Future: The result of the task. Raises Superseded if the script
+            run was superseded before the task started.
+
+        Raises:
+            Superseded: If the script run was superseded while waiting for
+                a slot.
+        """
+
+        run = self._current_run()
+        while not self._slots.acquire(timeout=POLL_INTERVAL):
+            if run[2] is not None:
+                _yield_to_streamlit()
+            if self._superseded(run):
+                raise Superseded()
+
+        # Timings of the task count towards the submitting script run
+        state = rerun_state()
+
+        def task():
+            if self._superseded(run):
+                raise Superseded()
+            with attach_rerun(state):
+                return function(*args, **kwargs)
+
+        try:
+            future = self._pool.submit(task)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        session = run[0]
+        with self._lock:
+            self._pending.setdefault(session, set()).add(future)
+
+        def done(future: Future):
+            self._slots.release()
+            with self._lock:
+                self._pending.get(session, set()).discard(future)
+
+        future.add_done_callback(done)
+        return future
+
+    def gather(self, *futures: Future) -> List[Any]:
+        """
+        Waits for tasks and returns their results, in order.
+
+        If Streamlit is asked to rerun or stop the script meanwhile, the
+        tasks not started yet are cancelled and Streamlit stops the script.
+
+        Args:
+            *futures (Future): As returned by `submit`.
+
+        Returns:
+            List[Any]: The results of the tasks.
+
+        Raises:
+            Exception: The first exception raised by a task.
+        """
+
+        run = self._current_run()
+        pending = set(futures)
+        try:
+            while pending:
+                _, pending = wait(pending, timeout=POLL_INTERVAL)
+                if pending and run[2] is not None:
+                    _yield_to_streamlit()
+                if pending and self._superseded(run):
+                    break
+        finally:
+            # Also when Streamlit stops the script for a rerun
+            for future in pending:
+                future.cancel()
+
+        # Tasks are cancelled or raise Superseded once a newer run started
+        if pending or any(
+            future.cancelled() or isinstance(future.exception(), Superseded)
+            for future in futures
+        ):
+            raise Superseded()
+
+        return [future.result() for future in futures]
+
+    def run(self, *tasks: Callable[[], Any]) -> List[Any]:
+        """
+        Runs tasks concurrently and returns their results, in order.
+
+        Args:
+            *tasks (Callable[[], Any]): Tasks without arguments.
+
+        Returns:
+            List[Any]: The results of the tasks.
+        """
+
+        return self.gather(*(self.submit(task) for task in tasks))
+
+
+compute = ComputeExecutor()
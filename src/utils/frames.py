@@ -0,0 +1,134 @@
+from typing import Collection, Hashable, List
+
+import numpy as np
+import pandas as pd
+
+
+def _with_categories(series: pd.Series, categories: pd.Index) -> pd.Series:
+    """
+    Switches a categorical series to a superset of its categories, avoiding a
+    re-code when its current categories are a prefix of the new ones.
+    """
+
+    current = series.cat.categories
+    if current.equals(categories):
+        return series
+    if current.equals(categories[: len(current)]):
+        return series.cat.add_categories(categories[len(current) :])
+    return series.cat.set_categories(categories)
+
+
+def concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenates frames like pd.concat, but keeps categorical columns
+    categorical when the frames saw different categories.
+
+    New categories are appended after the ones of the first frame, so the
+    codes of the (usually large) first frame stay valid and only the later
+    frames are re-coded.
+
+    Args:
+        frames (List[pd.DataFrame]): Frames with the same columns.
+
+    Returns:
+        pd.DataFrame: The concatenated frame with a fresh RangeIndex.
+    """
+
+    # Shallow copies, so swapping a column does not touch the caller's frames
+    frames = [frame.copy(deep=False) for frame in frames]
+    first = frames[0]
+
+    for column in first.columns:
+        dtypes = [frame[column].dtype for frame in frames]
+        if not all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+            continue
+
+        categories = first[column].cat.categories
+        for dtype in dtypes[1:]:
+            categories = categories.append(
+                dtype.categories.difference(categories)
+            )
+
+        for frame in frames:
+            frame[column] = _with_categories(frame[column], categories)
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def sort_categories(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sorts the categories of every categorical column, like a single
+    astype("category") of the whole column would have.
+
+    Frames assembled with concat_frames list late categories last, which
+    changes the order groupby results come out in.
+
+    Args:
+        df (pd.DataFrame): The frame to normalize.
+
+    Returns:
+        pd.DataFrame: The frame with sorted categories.
+    """
+
+    for column in df.columns:
+        series = df[column]
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        categories = series.cat.categories
+        if not categories.is_monotonic_increasing:
+            df[column] = series.cat.reorder_categories(
+                categories.sort_values()
+            )
+
+    return df
+
+
+def selection_codes(
+    categories: pd.Index, values: Collection[Hashable]
+) -> np.ndarray:
+    """
+    Translates a selection, e.g. of a multiselect widget, into the codes of
+    a categorical column's dictionary. Values outside of the dictionary are
+    left out.
+
+    Args:
+        categories (pd.Index): The dictionary, i.e. `series.cat.categories`.
+        values (Collection[Hashable]): The selected values.
+
+    Returns:
+        np.ndarray: The codes of the selected values.
+    """
+
+    codes = categories.get_indexer(pd.Index(list(values)))
+    return codes[codes >= 0]
+
+
+def isin_codes(series: pd.Series, values: Collection[Hashable]) -> np.ndarray:
+    """
+    Returns the rows of a column holding one of `values`, like
+    `series.isin(values)`.
+
+    A categorical column is filtered on its integer codes: the selection is
+    translated into codes once, and every row is looked up in a table of
+    the selected codes instead of being compared value by value.
+
+    Args:
+        series (pd.Series): The column to filter.
+        values (Collection[Hashable]): The selected values.
+
+    Returns:
+        np.ndarray: A boolean mask of the rows.
+    """
+
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series.isin(values).to_numpy()
+
+    selected = selection_codes(series.cat.categories, values)
+    codes = series.cat.codes.to_numpy()
+    if len(selected) == 1:
+        return codes == selected[0]
+
+    # One slot per code, plus a last one for the code -1 of missing values
+    table = np.zeros(len(series.cat.categories) + 1, dtype=bool)
+    table[selected] = True
+    return table.take(codes)
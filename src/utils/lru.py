@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class LRUCache:
+    """
+    A thread-safe mapping that keeps the most recently used entries, up to a
+    total size. Every entry counts as 1 towards `max_size` unless `size_of`
+    tells otherwise, e.g. the length of a serialized figure.
+
+    Usage:
+        cache = LRUCache(max_size=2)
+        value = cache.get(key)
+        if value is None:
+            value = cache.put(key, compute())
+    """
+
+    def __init__(
+        self,
+        max_size: float,
+        size_of: Callable[[Any], float] = lambda value: 1,
+    ):
+        """
+        Args:
+            max_size (float): Upper bound for the total size of the entries.
+            size_of (Callable[[Any], float]): Returns the size of a value.
+        """
+
+        self.max_size = max_size
+        self.size_of = size_of
+        self.size = 0
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """
+        Returns the value of a key and marks it as recently used, or
+        `default` if the key is not cached.
+        """
+
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any) -> Any:
+        """
+        Caches a value, evicting the least recently used entries until the
+        total size fits again. A value larger than `max_size` on its own is
+        not cached.
+
+        Returns:
+            Any: The value, for chaining.
+        """
+
+        size = self.size_of(value)
+        if size > self.max_size:
+            return value
+
+        with self._lock:
+            if key in self._entries:
+                self.size -= self.size_of(self._entries.pop(key))
+            self._entries[key] = value
+            self.size += size
+            while self.size > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= self.size_of(evicted)
+        return value
+
+    def clear(self):
+        """
+        Drops all entries.
+        """
+
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
@@ -0,0 +1,209 @@
+import contextlib
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from streamlit.delta_generator import DeltaGenerator
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from config import PERF_LOG, PERF_LOG_FILE
+from metrics import PAGE_RENDER_SECONDS, register_gauge
+
+logger = logging.getLogger("dashboard.perf")
+logger.propagate = False
+if PERF_LOG:
+    logger.setLevel(logging.INFO)
+    logger.addHandler(
+        logging.FileHandler(PERF_LOG_FILE)
+        if PERF_LOG_FILE
+        else logging.StreamHandler()
+    )
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 0
+
+
+def _rss() -> Optional[int]:
+    """
+    Returns the resident memory of the process in bytes, or None where
+    /proc is not available.
+    """
+
+    try:
+        with open("/proc/self/statm", "rb") as file:
+            return int(file.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class _Rerun(threading.local):
+    """
+    The timings of the script run on the current thread.
+    """
+
+    page: Optional[str] = None
+    session: Optional[str] = None
+    started: float = 0.0
+    records: Optional[List[Dict[str, object]]] = None
+    panel: Optional[DeltaGenerator] = None
+
+
+_rerun = _Rerun()
+
+# Seconds since its last rerun a session still counts as active
+SESSION_ACTIVE_SECONDS = 300
+# Time of the last rerun of every session
+_session_reruns: Dict[str, float] = {}
+_sessions_lock = threading.Lock()
+
+
+def _active_sessions() -> int:
+    """
+    Counts the sessions that reran a page recently, forgetting older ones.
+    """
+
+    cutoff = time.monotonic() - SESSION_ACTIVE_SECONDS
+    with _sessions_lock:
+        for session, last in list(_session_reruns.items()):
+            if last < cutoff:
+                del _session_reruns[session]
+        return len(_session_reruns)
+
+
+register_gauge(
+    "dashboard_sessions_active",
+    f"Sessions that ran a page in the last {SESSION_ACTIVE_SECONDS} seconds.",
+    _active_sessions,
+)
+
+
+def start_rerun(page: str, panel: Optional[DeltaGenerator] = None):
+    """
+    Starts collecting the timings of a page's script run.
+
+    Args:
+        page (str): The page title.
+        panel (Optional[DeltaGenerator]): A placeholder that shows the
+            timings collected so far, updated as they come in.
+    """
+
+    _rerun.page = page
+    _rerun.started = time.perf_counter()
+    _rerun.records = []
+    _rerun.panel = panel
+
+    ctx = get_script_run_ctx(suppress_warning=True)
+    _rerun.session = ctx.session_id if ctx is not None else None
+    if ctx is not None:
+        with _sessions_lock:
+            _session_reruns[ctx.session_id] = time.monotonic()
+
+
+def finish_rerun():
+    """
+    Records the time the page's script run took, called at its end.
+    """
+
+    if _rerun.page is not None:
+        PAGE_RENDER_SECONDS.observe(
+            time.perf_counter() - _rerun.started, page=_rerun.page
+        )
+
+
+def rerun_state() -> Tuple:
+    """
+    Returns the page, session and timings of the script run on the current
+    thread, for `attach_rerun` on another thread.
+    """
+
+    return _rerun.page, _rerun.session, _rerun.records
+
+
+@contextlib.contextmanager
+def attach_rerun(state: Tuple) -> Iterator[None]:
+    """
+    Records the timings of a block on another thread, e.g. a compute task,
+    with the script run `state` was taken from. The sidebar panel shows them
+    with the script run's next timing.
+
+    Args:
+        state (Tuple): As returned by `rerun_state`.
+    """
+
+    previous = rerun_state()
+    _rerun.page, _rerun.session, _rerun.records = state
+    try:
+        yield
+    finally:
+        _rerun.page, _rerun.session, _rerun.records = previous
+
+
+class timed:
+    """
+    Times a block or function and logs its duration and the change of the
+    process's resident memory as one JSON object.
+
+    Usage:
+        with timed("page.filter"):
+            ...
+
+        @timed("loader.read")
+        def read(...):
+            ...
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __call__(self, function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            # A fresh instance per call, so calls may nest or run in parallel
+            with timed(self.name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    def __enter__(self):
+        self._rss = _rss()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self._start
+        rss = _rss()
+        record = {
+            "name": self.name,
+            "ms": round(seconds * 1000, 3),
+            "rss_delta_mb": (
+                round((rss - self._rss) / 2**20, 3)
+                if rss is not None and self._rss is not None
+                else None
+            ),
+        }
+
+        ctx = get_script_run_ctx(suppress_warning=True)
+        logger.info(
+            json.dumps(
+                {
+                    "time": round(time.time(), 3),
+                    "session": ctx.session_id if ctx else _rerun.session,
+                    "page": _rerun.page,
+                    **record,
+                }
+            )
+        )
+
+        if _rerun.records is not None:
+            _rerun.records.append(record)
+            if _rerun.panel is not None:
+                _rerun.panel.dataframe(
+                    pd.DataFrame(_rerun.records),
+                    hide_index=True,
+                    use_container_width=True,
+                )
+        return False
@@ -1,5 +1,8 @@
 import streamlit as st
 
+from utils import perf
+from utils.executor import compute
+
 
 def set_base_layout(page_title: str):
     st.set_page_config(
@@ -37,3 +40,13 @@ def set_base_layout(page_title: str):
             Developed by *Philipp Meyer & Ole Schildt* as part of the **DS Data Management Fundamentals** course, taught by *Prof. Dr. Giacomo Welsch*.
             """
         )
+
+        # Hidden performance panel, shown with ?perf=1 in the page URL
+        panel = None
+        if st.query_params.get("perf"):
+            panel = st.expander("⏱️ Performance", expanded=True).empty()
+
+    # Collect the timings of this rerun from here on
+    perf.start_rerun(page_title, panel)
+    # Drop the compute tasks earlier reruns of the session left queued
+    compute.begin_rerun()
@@ -0,0 +1,79 @@
+from typing import Hashable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def bucketize(
+    values: pd.Series, thresholds: Sequence[float], labels: Sequence[object]
+) -> np.ndarray:
+    """
+    Maps each value to the label of the range it falls into, in one pass.
+
+    A value belongs to the first range whose upper threshold it does not
+    exceed, and to the last range if it exceeds all of them (as do NaNs).
+
+    Args:
+        values (pd.Series): The values to bucket.
+        thresholds (Sequence[float]): Ascending upper bounds of all ranges
+            but the last.
+        labels (Sequence[object]): One label per range, i.e. one more than
+            there are thresholds.
+
+    Returns:
+        np.ndarray: The label of every value.
+    """
+
+    if len(labels) != len(thresholds) + 1:
+        raise ValueError("Expected one label more than thresholds")
+
+    buckets = np.digitize(values.to_numpy(), thresholds, right=True)
+    return np.asarray(labels, dtype=object)[buckets]
+
+
+def sort_by_order(
+    df: pd.DataFrame, column: str, order: List[Hashable], by: str
+) -> pd.DataFrame:
+    """
+    Sorts rows by their position of `column` in `order`, then ascending by
+    `by`, with a single stable sort. Rows whose value is not in `order` are
+    dropped.
+
+    Args:
+        df (pd.DataFrame): The rows to sort.
+        column (str): The column ordered by `order`.
+        order (List[Hashable]): The values of `column` in display order.
+        by (str): The column to sort by within each value of `column`.
+
+    Returns:
+        pd.DataFrame: The sorted rows.
+    """
+
+    positions = pd.Categorical(df[column], categories=order).codes
+    keep = positions >= 0
+    # lexsort sorts by its last key first
+    rows = np.lexsort((df[by].to_numpy()[keep], positions[keep]))
+    return df[keep].iloc[rows]
+
+
+def split_traces(
+    df: pd.DataFrame, column: str, order: List[Hashable]
+) -> Iterator[Tuple[Hashable, pd.DataFrame]]:
+    """
+    Splits rows into one frame per value of `column` in a single pass,
+    keeping their order within each frame.
+
+    Args:
+        df (pd.DataFrame): The rows to split.
+        column (str): The column to split by.
+        order (List[Hashable]): The values to yield frames for, in this
+            order. Values without rows are skipped.
+
+    Yields:
+        Tuple[Hashable, pd.DataFrame]: Each value and its rows.
+    """
+
+    rows = df.groupby(column, observed=True, sort=False).indices
+    for value in order:
+        if value in rows:
+            yield value, df.iloc[rows[value]]
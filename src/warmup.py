@@ -0,0 +1,148 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+import streamlit as st
+
+from config import WARMUP_READY_FILE, WARMUP_WORKERS
+
+# The data and chart modules are imported by the warm-up itself, so the
+# server can start while they load in the background
+if TYPE_CHECKING:
+    from loader import DataLoader
+
+logger = logging.getLogger(__name__)
+
+# Set once the dataset is loaded and the default figures are rendered
+ready = threading.Event()
+
+
+def default_figures(loader: "DataLoader") -> List[Callable[[], object]]:
+    """
+    Returns a task per page rendering its figures for the default filters,
+    i.e. what a user sees when first opening the page.
+
+    Args:
+        loader (DataLoader): The loaded dataset.
+
+    Returns:
+        List[Callable[[], object]]: Tasks filling the figure cache.
+    """
+
+    from charts import (
+        profit_margin_figure,
+        profit_margins,
+        sales_figure,
+        shipment_category_figure,
+        shipment_counts,
+        shipment_total_figure,
+        state_figure,
+    )
+
+    categories = list(loader.cube.members("Category"))
+    years = loader.cube.members("year")
+    ship_years = sorted(shipment_counts(loader)["Year"].unique())
+
+    def profit_margin() -> object:
+        profit_margin_df = profit_margins(loader)
+        return profit_margin_figure(
+            loader,
+            sorted(profit_margin_df["year"].unique())[-1],
+            sorted(profit_margin_df["Category"].unique()),
+        )
+
+    return [
+        profit_margin,
+        lambda: sales_figure(
+            loader,
+            loader.get_date_bounds(),
+            "Monthly",
+            categories,
+            st.get_option("theme.textColor"),
+        ),
+        lambda: shipment_total_figure(loader, ship_years[-1]),
+        lambda: shipment_category_figure(
+            loader, ship_years[-1], categories[0]
+        ),
+        lambda: state_figure(
+            loader,
+            years[-1],
+            loader.get_date_bounds(years[-1]),
+            "Profit",
+            categories,
+        ),
+    ]
+
+
+def warm_up(
+    workers: int = WARMUP_WORKERS,
+    ready_file: Optional[str] = WARMUP_READY_FILE,
+) -> bool:
+    """
+    Loads the dataset and the map boundaries, then renders the default
+    figures of all pages, so the first visitors are served from the caches.
+
+    Failures are logged; the pages report them again when they are opened.
+
+    Args:
+        workers (int): Threads rendering the figures.
+        ready_file (Optional[str]): Created once the warm-up finished.
+
+    Returns:
+        bool: Whether the dataset could be loaded.
+    """
+
+    from geo import geojson_store
+    from loader import DataLoader
+
+    if ready_file and os.path.exists(ready_file):
+        os.remove(ready_file)
+
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="warmup"
+    ) as pool:
+        boundaries = pool.submit(geojson_store.get, "state")
+        try:
+            loader = DataLoader()
+        except Exception:
+            logger.exception("Warm-up could not load the dataset")
+            return False
+
+        tasks = [pool.submit(task) for task in default_figures(loader)]
+        for future in as_completed([boundaries, *tasks]):
+            if future.exception() is not None:
+                logger.warning("Warm-up task failed: %r", future.exception())
+
+    ready.set()
+    if ready_file:
+        os.makedirs(os.path.dirname(ready_file) or ".", exist_ok=True)
+        open(ready_file, "w").close()
+    return True
+
+
+def start(
+    workers: int = WARMUP_WORKERS,
+    ready_file: Optional[str] = WARMUP_READY_FILE,
+) -> threading.Thread:
+    """
+    Runs the warm-up in a background thread; wait for `ready` to know when
+    it finished.
+
+    Args:
+        workers (int): Threads rendering the figures.
+        ready_file (Optional[str]): Created once the warm-up finished.
+
+    Returns:
+        threading.Thread: The daemon thread running the warm-up.
+    """
+
+    thread = threading.Thread(
+        target=warm_up,
+        args=(workers, ready_file),
+        name="warmup",
+        daemon=True,
+    )
+    thread.start()
+    return thread
@@ -0,0 +1,126 @@
+import pandas as pd
+import pytest
+
+import synthetic
+from loader import DataLoader, DatasetCache
+from sources import CsvSource
+
+
+def _load(path: str, cache: DatasetCache) -> DataLoader:
+    return DataLoader(
+        source=CsvSource(path),
+        cache=cache,
+        snapshot_dir=None,
+        incremental=True,
+        chunksize=None,
+    )
+
+
+def _assert_fully_loaded(loader: DataLoader, path: str):
+    """
+    Checks that a loader holds the same rows as a fresh load of the file.
+    """
+
+    expected = _load(path, DatasetCache()).df
+    pd.testing.assert_frame_equal(loader.df, expected)
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """
+    A small synthetic dataset file and the lines of a second one, to be
+    appended to it.
+    """
+
+    path = synthetic.write_csv(str(tmp_path / "sales.csv"), 200, seed=0)
+    other = synthetic.write_csv(str(tmp_path / "more.csv"), 20, seed=1)
+    with open(other, "rb") as file:
+        lines = file.read().splitlines(keepends=True)[1:]
+    return path, lines
+
+
+@pytest.fixture
+def cache():
+    # Every request re-checks the file, as once the cache TTL ran out
+    return DatasetCache(ttl=0)
+
+
+@pytest.fixture
+def full_loads(monkeypatch):
+    """
+    Records the paths the whole dataset file is loaded from.
+    """
+
+    paths = []
+    load_dataset = DataLoader._load_dataset
+
+    def record(self, path):
+        paths.append(path)
+        return load_dataset(self, path)
+
+    monkeypatch.setattr(DataLoader, "_load_dataset", record)
+    return paths
+
+
+def test_clean_append_is_merged(dataset, cache, full_loads):
+    path, lines = dataset
+    version = _load(path, cache).version
+
+    with open(path, "ab") as file:
+        file.writelines(lines)
+    loader = _load(path, cache)
+
+    assert loader.version != version
+    assert len(loader.df) == 220
+    assert full_loads == [path]
+    _assert_fully_loaded(loader, path)
+
+
+def test_rewritten_file_is_reloaded(dataset, cache, full_loads):
+    path, lines = dataset
+    _load(path, cache)
+
+    with open(path, "rb") as file:
+        header, *rows = file.read().splitlines(keepends=True)
+    # Longer than before, but the bytes loaded earlier changed
+    with open(path, "wb") as file:
+        file.writelines([header, *lines, *rows])
+    loader = _load(path, cache)
+
+    assert len(loader.df) == 220
+    assert full_loads == [path, path]
+    _assert_fully_loaded(loader, path)
+
+
+def test_truncated_last_line_waits_for_its_end(dataset, cache, full_loads):
+    path, lines = dataset
+    _load(path, cache)
+
+    # The writer is still in the middle of the third line
+    with open(path, "ab") as file:
+        file.writelines(lines[:2])
+        file.write(lines[2][:10])
+    loader = _load(path, cache)
+
+    assert len(loader.df) == 202
+
+    with open(path, "ab") as file:
+        file.write(lines[2][10:])
+    loader = _load(path, cache)
+
+    assert len(loader.df) == 203
+    assert full_loads == [path]
+    _assert_fully_loaded(loader, path)
+
+
+def test_append_without_complete_line_keeps_version(
+    dataset, cache, full_loads
+):
+    path, lines = dataset
+    version = _load(path, cache).version
+
+    with open(path, "ab") as file:
+        file.write(lines[0][:10])
+
+    assert _load(path, cache).version == version
+    assert full_loads == [path]
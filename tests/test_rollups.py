@@ -0,0 +1,88 @@
+import datetime
+import random
+
+import pandas as pd
+import pytest
+
+import synthetic
+from loader import DataLoader, DatasetCache
+from rollups import ROLLUP_FREQUENCIES, SalesRollups
+from sources import CsvSource
+
+
+@pytest.fixture(scope="module")
+def loader(tmp_path_factory):
+    path = synthetic.write_csv(
+        str(tmp_path_factory.mktemp("data") / "sales.csv"), 5000, seed=0
+    )
+    return DataLoader(
+        source=CsvSource(path),
+        cache=DatasetCache(),
+        snapshot_dir=None,
+        chunksize=None,
+    )
+
+
+def _grouped(loader, date_range, freq, categories) -> pd.DataFrame:
+    """
+    The sales per period and category, grouped from the rows directly.
+    """
+
+    df = loader.get_data_for_metric(
+        ["Order Date", "Category", "Sales"], date_range=date_range
+    )
+    if categories:
+        df = df[df["Category"].isin(categories)]
+    return (
+        df.groupby(
+            [pd.Grouper(key="Order Date", freq=freq), "Category"],
+            observed=True,
+        )["Sales"]
+        .sum()
+        .reset_index()
+    )
+
+
+def _ranges(loader, count: int):
+    """
+    The whole date range, ranges starting and ending mid-week and
+    mid-month, and random ranges.
+    """
+
+    first, last = loader.get_date_bounds()
+    day = datetime.timedelta(days=1)
+
+    # A Wednesday and a 15th near the start of the data
+    wednesday = first + (2 - first.weekday()) % 7 * day
+    fifteenth = (first + 20 * day).replace(day=15)
+    yield first, last
+    yield wednesday, last - 3 * day
+    yield wednesday, wednesday + 4 * day
+    yield fifteenth, min(fifteenth + 365 * day, last)
+    yield fifteenth, fifteenth + 10 * day
+    yield last, last
+
+    rng = random.Random(0)
+    days = (last - first).days
+    for _ in range(count):
+        start = first + rng.randrange(days + 1) * day
+        yield start, start + rng.randrange((last - start).days + 1) * day
+
+
+@pytest.mark.parametrize("freq", ROLLUP_FREQUENCIES)
+def test_query_matches_grouping_the_rows(loader, freq):
+    rollups = SalesRollups()
+    categories = list(loader.cube.members("Category"))
+    columns = ["Order Date", "Category"]
+
+    for i, date_range in enumerate(_ranges(loader, 50)):
+        selected = [[], categories[:1], categories[1:]][i % 3]
+        expected = _grouped(loader, date_range, freq, selected)
+        actual = rollups.query(loader, date_range, freq, selected)
+
+        pd.testing.assert_frame_equal(
+            actual.sort_values(columns, ignore_index=True),
+            expected.sort_values(columns, ignore_index=True),
+            check_categorical=False,
+            obj=f"{freq} sales from {date_range[0]} to {date_range[1]}",
+        )